@@ -1,800 +1,4908 @@
-"""
-Customer Support Ticketing System Simulator (NO API VERSION)
-Uses LangGraph for multi-agent orchestration without external API calls
-All responses are generated using template-based rules
-"""
-
-from typing import TypedDict, Literal
-import random
-from datetime import datetime, timedelta
-import os
-import json
-
-# Install required packages:
-# pip install langgraph
-
-from langgraph.graph import StateGraph, END
-
-
-# ============= STATE DEFINITION =============
-class TicketState(TypedDict):
-    """State that gets passed through the graph"""
-    ticket_id: str
-    customer_id: str
-    query: str
-    intent: str
-    priority: str
-    agent_response: str
-    sentiment_score: float
-    escalated: bool
-    resolution_notes: list[str]
-    final_response: str
-
-
-# ============= FAKE DATABASE =============
-class FakeDatabase:
-    """Simulates customer and order database"""
-    
-    def __init__(self):
-        self.customers = {
-            "CUST001": {"name": "Alice Johnson", "tier": "premium", "balance": -45.99},
-            "CUST002": {"name": "Bob Smith", "tier": "standard", "balance": 0.0},
-            "CUST003": {"name": "Carol White", "tier": "premium", "balance": 150.00},
-            "CUST004": {"name": "David Brown", "tier": "standard", "balance": -120.50},
-            "CUST005": {"name": "Emma Davis", "tier": "premium", "balance": 25.00},
-            "CUST006": {"name": "Frank Miller", "tier": "standard", "balance": -75.00},
-            "CUST007": {"name": "Grace Wilson", "tier": "premium", "balance": 0.0},
-            "CUST008": {"name": "Henry Taylor", "tier": "standard", "balance": -200.00},
-        }
-        
-        self.orders = {
-            "ORD12345": {"customer": "CUST001", "status": "delivered", "item": "Laptop", "date": "2024-11-15"},
-            "ORD12346": {"customer": "CUST002", "status": "in_transit", "item": "Headphones", "date": "2024-12-10"},
-            "ORD12347": {"customer": "CUST003", "status": "delivered", "item": "Keyboard", "date": "2024-12-01"},
-            "ORD12348": {"customer": "CUST005", "status": "processing", "item": "Monitor", "date": "2024-12-15"},
-            "ORD12349": {"customer": "CUST006", "status": "delivered", "item": "Mouse", "date": "2024-11-20"},
-            "ORD12350": {"customer": "CUST007", "status": "in_transit", "item": "Webcam", "date": "2024-12-12"},
-            "ORD12351": {"customer": "CUST008", "status": "delivered", "item": "Speakers", "date": "2024-11-10"},
-        }
-        
-        self.tech_issues = {
-            "wifi": "Restart router, check if other devices connect, verify password",
-            "app": "Clear cache, update app to latest version, reinstall if needed",
-            "slow": "Close background apps, check storage space, restart device",
-            "login": "Reset password via email, clear browser cookies, check caps lock",
-        }
-    
-    def get_customer(self, customer_id: str) -> dict:
-        return self.customers.get(customer_id, {"name": "Unknown", "tier": "standard", "balance": 0.0})
-    
-    def get_order(self, order_id: str) -> dict:
-        return self.orders.get(order_id, {"error": "Order not found"})
-    
-    def get_tech_solution(self, issue_key: str) -> str:
-        return self.tech_issues.get(issue_key, "Please contact advanced technical support")
-
-
-# ============= POLICY RETRIEVAL =============
-class PolicyRetriever:
-    """Simulates policy document retrieval"""
-    
-    def __init__(self):
-        self.policies = {
-            "return_policy": {
-                "window": "30 days",
-                "conditions": "unused and in original packaging",
-                "refund_time": "5-7 business days",
-                "premium_shipping": "free",
-                "standard_shipping": "$5.99"
-            },
-            "billing_policy": {
-                "due_days": 15,
-                "initial_late_fee": 10,
-                "recurring_late_fee": 5,
-                "payment_plan_threshold": 100
-            },
-            "tech_support_policy": {
-                "premium_response": "2 hours",
-                "standard_response": "24 hours"
-            }
-        }
-    
-    def get_policy(self, policy_type: str) -> dict:
-        return self.policies.get(policy_type, {})
-
-
-# ============= RESPONSE TEMPLATES =============
-class ResponseTemplates:
-    """Template-based response generator"""
-    
-    @staticmethod
-    def generate_billing_response(customer: dict, policy: dict, query: str) -> str:
-        name = customer.get('name', 'Valued Customer')
-        tier = customer.get('tier', 'standard')
-        balance = customer.get('balance', 0.0)
-        
-        if balance < 0:
-            # Customer owes money
-            return f"""Dear {name},
-
-Thank you for contacting us regarding your billing concern.
-
-**Current Account Status:**
-- Account Balance: ${abs(balance):.2f} (amount owed)
-- Account Tier: {tier.capitalize()}
-
-I understand you have questions about the charges on your account. Let me provide some clarity:
-
-**Our Billing Policy:**
-- Payment is due within {policy.get('due_days', 15)} days of invoice
-- Initial late fee: ${policy.get('initial_late_fee', 10)} after the due date
-- Additional fees: ${policy.get('recurring_late_fee', 5)} per week thereafter
-
-**Available Options:**
-1. Make a one-time payment to clear your balance
-2. Set up a payment plan (available for balances over ${policy.get('payment_plan_threshold', 100)})
-3. Contact us to discuss your specific situation
-
-If you believe there has been an error, please provide:
-- Date of your payment
-- Payment confirmation number
-- Any relevant documentation
-
-We're here to help resolve this fairly and quickly.
-
-Best regards,
-Billing Support Team"""
-        else:
-            return f"""Dear {name},
-
-Thank you for reaching out about your billing.
-
-**Current Account Status:**
-- Account Balance: ${balance:.2f} (credit)
-- Account Tier: {tier.capitalize()}
-
-Your account is in good standing! Is there a specific billing question I can help you with?
-
-Best regards,
-Billing Support Team"""
-    
-    @staticmethod
-    def generate_tech_response(customer: dict, tech_solution: str, query: str) -> str:
-        name = customer.get('name', 'Valued Customer')
-        tier = customer.get('tier', 'standard')
-        policy = PolicyRetriever().get_policy("tech_support_policy")
-        
-        return f"""Hi {name},
-
-I'd be happy to help you resolve your technical issue! As a {tier} member, you have access to our technical support with {policy.get(f'{tier}_response', '24 hours')} response time.
-
-**Troubleshooting Steps:**
-
-{tech_solution}
-
-**Additional Recommendations:**
-- Ensure your device/app is updated to the latest version
-- Check your internet connection if the issue is online
-- Restart your device after making changes
-
-**Next Steps:**
-Please try these troubleshooting steps and let us know if the issue persists. If you continue to experience problems:
-- Reply to this email with details of what you've tried
-- Include any error messages you're seeing
-- Our team will prioritize your case
-
-We're committed to getting you back up and running quickly!
-
-Best regards,
-Technical Support Team"""
-    
-    @staticmethod
-    def generate_returns_response(customer: dict, policy: dict, query: str) -> str:
-        name = customer.get('name', 'Valued Customer')
-        tier = customer.get('tier', 'standard')
-        shipping_cost = policy.get(f'{tier}_shipping', '$5.99')
-        
-        return f"""Dear {name},
-
-I sincerely apologize for any issues with your order. I'm here to help you with the return process.
-
-**Return Policy:**
-- Return window: {policy.get('window', '30 days')} from delivery
-- Condition required: {policy.get('conditions', 'unused in original packaging')}
-- Refund processing: {policy.get('refund_time', '5-7 business days')}
-- Return shipping: {shipping_cost} for {tier} members
-
-**How to Return Your Item:**
-
-1. **Initiate Return:** We'll email you a return authorization within 24 hours
-2. **Pack the Item:** Use original packaging if possible
-3. **Ship It Back:** Use the prepaid label we provide (or arrange your own shipping)
-4. **Get Your Refund:** Once we receive and inspect the item, your refund will be processed
-
-**What We Need From You:**
-- Order number (if available)
-- Reason for return
-- Photos of the item (if damaged or incorrect)
-
-I've flagged your case for priority processing. You should receive your return instructions within 24 hours.
-
-We value your business and want to make this right.
-
-Best regards,
-Returns Department"""
-    
-    @staticmethod
-    def generate_general_response(customer: dict, order_info: dict = None, query: str = "") -> str:
-        name = customer.get('name', 'Valued Customer')
-        
-        if order_info and "error" not in order_info:
-            status = order_info.get('status', 'unknown')
-            item = order_info.get('item', 'your item')
-            date = order_info.get('date', 'recently')
-            
-            status_messages = {
-                "delivered": f"Great news! Your {item} was delivered. If you haven't received it, please check with your building management or neighbors.",
-                "in_transit": f"Your {item} is currently on its way to you! Expected delivery is within 2-3 business days.",
-                "processing": f"Your {item} order is being prepared for shipment. It should ship within 1-2 business days.",
-            }
-            
-            return f"""Hi {name},
-
-Thank you for reaching out about your order!
-
-**Order Details:**
-- Item: {item}
-- Order Date: {date}
-- Status: {status.replace('_', ' ').title()}
-
-{status_messages.get(status, 'Your order is being processed.')}
-
-**Tracking Information:**
-You'll receive email updates at each stage:
-- Order confirmation (sent)
-- Shipment notification (with tracking number)
-- Delivery confirmation
-
-If you have any concerns or don't receive your order within the expected timeframe, please don't hesitate to contact us again.
-
-Is there anything else I can help you with?
-
-Best regards,
-Customer Support Team"""
-        else:
-            return f"""Hi {name},
-
-Thank you for contacting us!
-
-I'm here to help with your inquiry. To provide you with the most accurate information, could you please provide:
-- Your order number (if this is order-related)
-- A brief description of what you need assistance with
-- Any relevant dates or details
-
-Our team is committed to resolving your concern as quickly as possible.
-
-Best regards,
-Customer Support Team"""
-
-
-# ============= SENTIMENT ANALYZER =============
-class SentimentAnalyzer:
-    """Rule-based sentiment analysis"""
-    
-    @staticmethod
-    def analyze_query(query: str) -> float:
-        """Analyze customer query sentiment (0.0 = very negative, 1.0 = very positive)"""
-        query_lower = query.lower()
-        
-        # Negative indicators
-        negative_words = ["terrible", "awful", "horrible", "angry", "furious", "ridiculous", 
-                         "unacceptable", "disgusted", "worst", "never", "hate"]
-        # Positive indicators
-        positive_words = ["thanks", "thank you", "please", "appreciate", "grateful", "good"]
-        # Urgency indicators
-        urgent_words = ["immediately", "urgent", "asap", "now", "emergency"]
-        
-        neg_count = sum(1 for word in negative_words if word in query_lower)
-        pos_count = sum(1 for word in positive_words if word in query_lower)
-        urgent_count = sum(1 for word in urgent_words if word in query_lower)
-        
-        # Base sentiment
-        base_score = 0.7
-        
-        # Adjust for negative/positive words
-        sentiment = base_score - (neg_count * 0.15) + (pos_count * 0.1) - (urgent_count * 0.1)
-        
-        # Clamp between 0 and 1
-        return max(0.0, min(1.0, sentiment))
-    
-    @staticmethod
-    def analyze_response(response: str, query_sentiment: float) -> float:
-        """Analyze response quality based on response content and query sentiment"""
-        response_lower = response.lower()
-        
-        # Quality indicators
-        has_apology = any(word in response_lower for word in ["apology", "apologize", "sorry"])
-        has_solution = any(word in response_lower for word in ["steps", "process", "how to", "options"])
-        has_timeline = any(word in response_lower for word in ["within", "days", "hours", "shortly"])
-        is_polite = any(word in response_lower for word in ["please", "thank you", "appreciate"])
-        
-        base_quality = 0.75
-        
-        if has_apology and query_sentiment < 0.6:
-            base_quality += 0.1
-        if has_solution:
-            base_quality += 0.1
-        if has_timeline:
-            base_quality += 0.05
-        if is_polite:
-            base_quality += 0.05
-        
-        return min(1.0, base_quality)
-
-
-# ============= INITIALIZE TOOLS =============
-db = FakeDatabase()
-policy_retriever = PolicyRetriever()
-response_generator = ResponseTemplates()
-sentiment_analyzer = SentimentAnalyzer()
-
-
-# ============= SAMPLE QUERIES =============
-SAMPLE_QUERIES = [
-    {
-        "customer_id": "CUST001",
-        "query": "I received my laptop but it's not what I ordered. I want to return it and get a refund immediately!",
-    },
-    {
-        "customer_id": "CUST002",
-        "query": "My headphones haven't arrived yet. Where is my order ORD12346?",
-    },
-    {
-        "customer_id": "CUST004",
-        "query": "Why am I being charged late fees? This is ridiculous! I paid on time!",
-    },
-    {
-        "customer_id": "CUST003",
-        "query": "My WiFi keeps disconnecting. Can you help me troubleshoot?",
-    },
-    {
-        "customer_id": "CUST005",
-        "query": "When will my monitor ship? I ordered it 2 days ago and it's still processing.",
-    },
-    {
-        "customer_id": "CUST006",
-        "query": "The mouse I received is defective. The left click doesn't work properly.",
-    },
-    {
-        "customer_id": "CUST007",
-        "query": "My app keeps crashing every time I try to log in. Please help!",
-    },
-    {
-        "customer_id": "CUST008",
-        "query": "I can't afford to pay $200 right now. Can I set up a payment plan?",
-    },
-]
-
-
-# ============= NODE FUNCTIONS =============
-
-def classify_intent(state: TicketState) -> TicketState:
-    """Classify the intent of the customer query"""
-    query = state["query"].lower()
-    
-    # Simple keyword-based classification
-    if any(word in query for word in ["return", "refund", "send back", "wrong item"]):
-        intent = "returns"
-    elif any(word in query for word in ["charge", "bill", "payment", "balance", "fee"]):
-        intent = "billing"
-    elif any(word in query for word in ["not working", "broken", "crash", "error", "fix", "help", "troubleshoot", "wifi", "disconnect"]):
-        intent = "tech_support"
-    elif any(word in query for word in ["where", "status", "tracking", "order", "arrived", "delivery"]):
-        intent = "order_status"
-    else:
-        intent = "general"
-    
-    # Determine priority based on sentiment and keywords
-    if any(word in query for word in ["immediately", "urgent", "angry", "ridiculous", "terrible"]):
-        priority = "high"
-    else:
-        priority = "normal"
-    
-    state["intent"] = intent
-    state["priority"] = priority
-    state["resolution_notes"].append(f"Intent classified as: {intent} (Priority: {priority})")
-    
-    return state
-
-
-def route_to_agent(state: TicketState) -> Literal["billing_agent", "tech_agent", "returns_agent", "general_agent"]:
-    """Route to appropriate specialized agent"""
-    intent = state["intent"]
-    
-    routing = {
-        "billing": "billing_agent",
-        "tech_support": "tech_agent",
-        "returns": "returns_agent",
-        "order_status": "general_agent",
-        "general": "general_agent",
-    }
-    
-    return routing.get(intent, "general_agent")
-
-
-def billing_agent(state: TicketState) -> TicketState:
-    """Handle billing-related queries"""
-    customer = db.get_customer(state["customer_id"])
-    policy = policy_retriever.get_policy("billing_policy")
-    
-    response = response_generator.generate_billing_response(customer, policy, state["query"])
-    
-    state["agent_response"] = response
-    state["resolution_notes"].append(f"Billing agent handled query. Balance: ${customer.get('balance', 0.0)}")
-    
-    return state
-
-
-def tech_agent(state: TicketState) -> TicketState:
-    """Handle technical support queries"""
-    customer = db.get_customer(state["customer_id"])
-    
-    # Try to find relevant tech solution
-    query_lower = state["query"].lower()
-    tech_solution = None
-    for issue_key in db.tech_issues.keys():
-        if issue_key in query_lower:
-            tech_solution = db.get_tech_solution(issue_key)
-            break
-    
-    if not tech_solution:
-        tech_solution = """1. Check if the issue occurs on other devices
-2. Restart the device/application
-3. Check for software updates
-4. Contact support if the issue persists"""
-    
-    response = response_generator.generate_tech_response(customer, tech_solution, state["query"])
-    
-    state["agent_response"] = response
-    state["resolution_notes"].append("Tech support agent provided troubleshooting steps")
-    
-    return state
-
-
-def returns_agent(state: TicketState) -> TicketState:
-    """Handle returns and refunds"""
-    customer = db.get_customer(state["customer_id"])
-    policy = policy_retriever.get_policy("return_policy")
-    
-    response = response_generator.generate_returns_response(customer, policy, state["query"])
-    
-    state["agent_response"] = response
-    state["resolution_notes"].append("Returns agent initiated return process")
-    
-    return state
-
-
-def general_agent(state: TicketState) -> TicketState:
-    """Handle general queries and order status"""
-    customer = db.get_customer(state["customer_id"])
-    
-    # Check if query mentions an order ID
-    query_words = state["query"].split()
-    order_info = None
-    for word in query_words:
-        if word.startswith("ORD"):
-            order_info = db.get_order(word)
-            break
-    
-    response = response_generator.generate_general_response(customer, order_info, state["query"])
-    
-    state["agent_response"] = response
-    state["resolution_notes"].append("General agent handled query")
-    
-    return state
-
-
-def sentiment_checker(state: TicketState) -> TicketState:
-    """Analyze sentiment of the query and response quality"""
-    
-    # Analyze query sentiment
-    query_sentiment = sentiment_analyzer.analyze_query(state["query"])
-    
-    # Analyze response quality
-    response_quality = sentiment_analyzer.analyze_response(state["agent_response"], query_sentiment)
-    
-    state["sentiment_score"] = response_quality
-    
-    # Escalate if sentiment is poor or priority is high and sentiment is moderate
-    if response_quality < 0.6 or (state["priority"] == "high" and response_quality < 0.8):
-        state["escalated"] = True
-        state["resolution_notes"].append(f"⚠️  Escalated to human review (quality score: {response_quality:.2f}, query sentiment: {query_sentiment:.2f})")
-    else:
-        state["escalated"] = False
-        state["resolution_notes"].append(f"✓ Auto-approved (quality score: {response_quality:.2f})")
-    
-    return state
-
-
-def should_escalate(state: TicketState) -> Literal["human_review", "finalize"]:
-    """Decide whether to escalate to human review"""
-    return "human_review" if state["escalated"] else "finalize"
-
-
-def human_review(state: TicketState) -> TicketState:
-    """Simulate human review (adds note)"""
-    state["resolution_notes"].append("👤 ESCALATED: Human agent reviewing before sending")
-    state["final_response"] = "[PENDING HUMAN REVIEW]\n\n" + state["agent_response"]
-    return state
-
-
-def finalize_response(state: TicketState) -> TicketState:
-    """Finalize and approve response"""
-    state["final_response"] = state["agent_response"]
-    state["resolution_notes"].append("✓ Response approved and sent to customer")
-    return state
-
-
-# ============= BUILD GRAPH =============
-
-def create_support_graph():
-    """Create the LangGraph workflow"""
-    
-    workflow = StateGraph(TicketState)
-    
-    # Add nodes
-    workflow.add_node("classify", classify_intent)
-    workflow.add_node("billing_agent", billing_agent)
-    workflow.add_node("tech_agent", tech_agent)
-    workflow.add_node("returns_agent", returns_agent)
-    workflow.add_node("general_agent", general_agent)
-    workflow.add_node("sentiment_check", sentiment_checker)
-    workflow.add_node("human_review", human_review)
-    workflow.add_node("finalize", finalize_response)
-    
-    # Set entry point
-    workflow.set_entry_point("classify")
-    
-    # Add conditional routing from classify to agents
-    workflow.add_conditional_edges(
-        "classify",
-        route_to_agent,
-        {
-            "billing_agent": "billing_agent",
-            "tech_agent": "tech_agent",
-            "returns_agent": "returns_agent",
-            "general_agent": "general_agent",
-        }
-    )
-    
-    # All agents go to sentiment check
-    workflow.add_edge("billing_agent", "sentiment_check")
-    workflow.add_edge("tech_agent", "sentiment_check")
-    workflow.add_edge("returns_agent", "sentiment_check")
-    workflow.add_edge("general_agent", "sentiment_check")
-    
-    # Conditional routing based on sentiment
-    workflow.add_conditional_edges(
-        "sentiment_check",
-        should_escalate,
-        {
-            "human_review": "human_review",
-            "finalize": "finalize",
-        }
-    )
-    
-    # Both paths end after their final node
-    workflow.add_edge("human_review", END)
-    workflow.add_edge("finalize", END)
-    
-    return workflow.compile()
-
-
-# ============= MAIN EXECUTION =============
-
-def process_ticket(query_data: dict, graph):
-    """Process a single support ticket"""
-    
-    ticket_id = f"TKT{random.randint(10000, 99999)}"
-    
-    initial_state = TicketState(
-        ticket_id=ticket_id,
-        customer_id=query_data["customer_id"],
-        query=query_data["query"],
-        intent="",
-        priority="",
-        agent_response="",
-        sentiment_score=0.0,
-        escalated=False,
-        resolution_notes=[],
-        final_response=""
-    )
-    
-    print(f"\n{'='*80}")
-    print(f"TICKET ID: {ticket_id}")
-    print(f"CUSTOMER: {query_data['customer_id']}")
-    print(f"{'='*80}")
-    print(f"\nCUSTOMER QUERY:")
-    print(f"{query_data['query']}")
-    print(f"\n{'-'*80}")
-    
-    # Run through the graph
-    result = graph.invoke(initial_state)
-    
-    print(f"\nRESOLUTION FLOW:")
-    for note in result["resolution_notes"]:
-        print(f"  • {note}")
-    
-    print(f"\n{'-'*80}")
-    print(f"FINAL RESPONSE:")
-    print(f"{result['final_response']}")
-    print(f"{'='*80}\n")
-    
-    return result
-
-
-def save_results_to_file(results: list, output_folder: str = "ticket_results"):
-    """Save ticket results to organized files in a folder"""
-    
-    # Create output folder if it doesn't exist
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    
-    # Create timestamp for this run
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    
-    # Save individual ticket files
-    for result in results:
-        ticket_id = result["ticket_id"]
-        customer_id = result["customer_id"]
-        
-        # Create detailed ticket report
-        ticket_report = f"""CUSTOMER SUPPORT TICKET REPORT
-{'='*80}
-Ticket ID: {ticket_id}
-Customer ID: {customer_id}
-Customer Name: {db.get_customer(customer_id).get('name', 'Unknown')}
-Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-{'='*80}
-
-CUSTOMER QUERY:
-{result['query']}
-
-{'='*80}
-TICKET CLASSIFICATION:
-Intent: {result['intent']}
-Priority: {result['priority']}
-Sentiment Score: {result['sentiment_score']:.2f}
-Escalated: {'Yes' if result['escalated'] else 'No'}
-
-{'='*80}
-RESOLUTION FLOW:
-"""
-        for note in result['resolution_notes']:
-            ticket_report += f"  • {note}\n"
-        
-        ticket_report += f"""
-{'='*80}
-FINAL RESPONSE:
-{result['final_response']}
-
-{'='*80}
-"""
-        
-        # Save individual ticket
-        ticket_filename = os.path.join(output_folder, f"{ticket_id}_{timestamp}.txt")
-        with open(ticket_filename, 'w', encoding='utf-8') as f:
-            f.write(ticket_report)
-    
-    # Save summary report
-    summary_report = f"""CUSTOMER SUPPORT SUMMARY REPORT
-{'='*80}
-Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
-{'='*80}
-
-STATISTICS:
-Total tickets processed: {len(results)}
-Escalated to human review: {sum(1 for r in results if r['escalated'])}
-Auto-resolved: {sum(1 for r in results if not r['escalated'])}
-
-INTENT DISTRIBUTION:
-"""
-    
-    intent_counts = {}
-    for r in results:
-        intent_counts[r['intent']] = intent_counts.get(r['intent'], 0) + 1
-    
-    for intent, count in intent_counts.items():
-        summary_report += f"  • {intent}: {count}\n"
-    
-    summary_report += f"\nAVERAGE QUALITY SCORE: {sum(r['sentiment_score'] for r in results) / len(results):.2f}\n\n"
-    summary_report += f"{'='*80}\nTICKET DETAILS:\n{'='*80}\n\n"
-    
-    for result in results:
-        summary_report += f"""
-Ticket: {result['ticket_id']}
-Customer: {db.get_customer(result['customer_id']).get('name', 'Unknown')} ({result['customer_id']})
-Intent: {result['intent']} | Priority: {result['priority']} | Escalated: {'Yes' if result['escalated'] else 'No'}
-Query: {result['query'][:100]}{'...' if len(result['query']) > 100 else ''}
----
-"""
-    
-    summary_filename = os.path.join(output_folder, f"SUMMARY_{timestamp}.txt")
-    with open(summary_filename, 'w', encoding='utf-8') as f:
-        f.write(summary_report)
-    
-    # Save JSON version for data analysis
-    json_data = []
-    for result in results:
-        json_data.append({
-            "ticket_id": result["ticket_id"],
-            "customer_id": result["customer_id"],
-            "customer_name": db.get_customer(result["customer_id"]).get('name', 'Unknown'),
-            "query": result["query"],
-            "intent": result["intent"],
-            "priority": result["priority"],
-            "sentiment_score": result["sentiment_score"],
-            "escalated": result["escalated"],
-            "resolution_notes": result["resolution_notes"],
-            "final_response": result["final_response"],
-            "timestamp": datetime.now().isoformat()
-        })
-    
-    json_filename = os.path.join(output_folder, f"tickets_data_{timestamp}.json")
-    with open(json_filename, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, indent=2, ensure_ascii=False)
-    
-    return output_folder, timestamp
-
-
-def main():
-    """Main execution function"""
-    print("🎫 Customer Support Ticketing System Simulator")
-    print("=" * 80)
-    
-    # Create the graph
-    support_graph = create_support_graph()
-    
-    # Process sample queries
-    print("\nProcessing sample support tickets...\n")
-    
-    results = []
-    for query_data in SAMPLE_QUERIES:
-        result = process_ticket(query_data, support_graph)
-        results.append(result)
-    
-    # Summary statistics
-    print("\n" + "="*80)
-    print("SUMMARY STATISTICS")
-    print("="*80)
-    print(f"Total tickets processed: {len(results)}")
-    print(f"Escalated to human review: {sum(1 for r in results if r['escalated'])}")
-    print(f"Auto-resolved: {sum(1 for r in results if not r['escalated'])}")
-    
-    intent_counts = {}
-    for r in results:
-        intent_counts[r['intent']] = intent_counts.get(r['intent'], 0) + 1
-    
-    print(f"\nIntent Distribution:")
-    for intent, count in intent_counts.items():
-        print(f"  • {intent}: {count}")
-    
-    print(f"\nAverage Quality Score: {sum(r['sentiment_score'] for r in results) / len(results):.2f}")
-    
-    # Save results to files
-    print("\n" + "="*80)
-    print("SAVING RESULTS TO FILES")
-    print("="*80)
-    
-    output_folder, timestamp = save_results_to_file(results)
-    
-    print(f"✓ Results saved to folder: {output_folder}/")
-    print(f"✓ Individual ticket reports: {len(results)} files")
-    print(f"✓ Summary report: SUMMARY_{timestamp}.txt")
-    print(f"✓ JSON data file: tickets_data_{timestamp}.json")
-    print(f"\n📁 Check the '{output_folder}' folder for all saved files!")
-    print("="*80)
-
-
-if __name__ == "__main__":
+"""
+Customer Support Ticketing System Simulator (NO API VERSION)
+Uses LangGraph for multi-agent orchestration without external API calls
+All responses are generated using template-based rules
+"""
+
+from typing import TypedDict, Literal
+from types import MappingProxyType
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+import argparse
+import csv
+import asyncio
+import bisect
+import codecs
+import concurrent.futures
+import contextlib
+import contextvars
+import functools
+import glob
+import heapq
+import itertools
+import math
+import mmap
+import queue
+import random
+import re
+import signal
+import sqlite3
+import string
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+import os
+import json
+
+# Install required packages:
+# pip install langgraph numpy
+#
+# langgraph is imported by create_support_graph, not here: it takes most of a
+# second to import, and the fast engine, reports and the service's setup do
+# not need it (see check_startup).
+
+
+# ============= STATE DEFINITION =============
+class TicketState(TypedDict):
+    """State that gets passed through the graph"""
+    ticket_id: str
+    customer_id: str
+    query: str
+    intent: str
+    priority: str
+    agent_response: str
+    sentiment_score: float
+    escalated: bool
+    resolution_notes: list[str]
+    final_response: str
+
+
+# ============= COMPACT TICKETS =============
+# Completed tickets held in bulk (e.g. for end-of-day reporting) can be kept
+# as CompactTicket records: small-int codes instead of repeated strings, and
+# resolution notes packed as (event code, numeric arg) pairs that are only
+# turned back into text when a report or dashboard needs them.
+INTENT_CODES = ("", "billing", "tech_support", "returns", "order_status", "general")
+PRIORITY_CODES = ("", "normal", "high")
+_INTENT_IDS = {intent: code for code, intent in enumerate(INTENT_CODES)}
+_PRIORITY_IDS = {priority: code for code, priority in enumerate(PRIORITY_CODES)}
+
+# Resolution note events: (code, pattern recognizing the note, renderer)
+NOTE_TEXT = 0
+NOTE_EVENTS = {
+    1: (r"Intent classified as: .* \(Priority: .*\)",
+        lambda ticket, arg: f"Intent classified as: {ticket.intent} (Priority: {ticket.priority})"),
+    2: (r"Billing agent handled query\. Balance: \$(\S+)",
+        lambda ticket, arg: f"Billing agent handled query. Balance: ${arg}"),
+    3: (r"Tech support agent provided troubleshooting steps",
+        lambda ticket, arg: "Tech support agent provided troubleshooting steps"),
+    4: (r"Returns agent initiated return process",
+        lambda ticket, arg: "Returns agent initiated return process"),
+    5: (r"General agent handled query",
+        lambda ticket, arg: "General agent handled query"),
+    6: (r"⚠️  Escalated to human review \(quality score: \S+, query sentiment: (\S+)\)",
+        lambda ticket, arg: f"⚠️  Escalated to human review (quality score: {ticket.sentiment_score:.2f}, query sentiment: {arg:.2f})"),
+    7: (r"✓ Auto-approved \(quality score: (\S+)\)",
+        lambda ticket, arg: f"✓ Auto-approved (quality score: {arg:.2f})"),
+    8: (r"👤 ESCALATED: Human agent reviewing before sending",
+        lambda ticket, arg: "👤 ESCALATED: Human agent reviewing before sending"),
+    9: (r"✓ Response approved and sent to customer",
+        lambda ticket, arg: "✓ Response approved and sent to customer"),
+}
+_NOTE_PATTERNS = [(code, re.compile(pattern)) for code, (pattern, _) in NOTE_EVENTS.items()]
+_NOTE = struct.Struct("<Bd")
+HUMAN_REVIEW_PREFIX = "[PENDING HUMAN REVIEW]\n\n"
+
+
+class CompactTicket:
+    """Memory-compact completed ticket that still reads like a TicketState
+    
+    Supports ticket["field"] access for every TicketState key, so it can be
+    passed straight to save_results_to_file; to_dict/from_dict convert to and
+    from the plain dict shape.
+    """
+    
+    __slots__ = ("ticket_id", "customer_id", "query", "_intent", "_priority", "escalated", "sentiment_score",
+                 "agent_response", "_final_response", "_notes", "_note_texts")
+    
+    FIELDS = tuple(TicketState.__annotations__)
+    
+    def __init__(self, ticket_id: str, customer_id: str, query: str, intent: str, priority: str,
+                 agent_response: str, sentiment_score: float, escalated: bool, resolution_notes: list,
+                 final_response: str):
+        self.ticket_id = ticket_id
+        self.customer_id = customer_id
+        self.query = query
+        if intent not in _INTENT_IDS or priority not in _PRIORITY_IDS:
+            raise ValueError(f"Cannot encode intent {intent!r} / priority {priority!r}")
+        self._intent = _INTENT_IDS[intent]
+        self._priority = _PRIORITY_IDS[priority]
+        self.escalated = bool(escalated)
+        self.sentiment_score = sentiment_score
+        self.agent_response = agent_response
+        
+        # The final response is only stored when it can't be derived
+        derived = HUMAN_REVIEW_PREFIX + agent_response if escalated else agent_response
+        self._final_response = None if final_response == derived else final_response
+        
+        self._note_texts = None
+        self._notes = b"".join(_NOTE.pack(*self._encode_note(note)) for note in resolution_notes)
+    
+    @classmethod
+    def from_dict(cls, state: dict) -> "CompactTicket":
+        return cls(**{field: state[field] for field in cls.FIELDS})
+    
+    def to_dict(self) -> TicketState:
+        return TicketState(**{field: self[field] for field in self.FIELDS})
+    
+    def __getitem__(self, field: str):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+    
+    @property
+    def intent(self) -> str:
+        return INTENT_CODES[self._intent]
+    
+    @property
+    def priority(self) -> str:
+        return PRIORITY_CODES[self._priority]
+    
+    @property
+    def final_response(self) -> str:
+        if self._final_response is not None:
+            return self._final_response
+        return HUMAN_REVIEW_PREFIX + self.agent_response if self.escalated else self.agent_response
+    
+    @property
+    def note_events(self) -> list:
+        """The resolution notes as (event code, numeric arg) pairs"""
+        return list(_NOTE.iter_unpack(self._notes))
+    
+    @property
+    def resolution_notes(self) -> list:
+        """Render the resolution notes back to text"""
+        return [self._note_texts[int(arg)] if code == NOTE_TEXT else NOTE_EVENTS[code][1](self, arg)
+                for code, arg in _NOTE.iter_unpack(self._notes)]
+    
+    def _encode_note(self, note: str) -> tuple:
+        for code, pattern in _NOTE_PATTERNS:
+            match = pattern.fullmatch(note)
+            if match:
+                try:
+                    arg = float(match.group(1)) if pattern.groups else 0.0
+                except ValueError:
+                    break
+                # Only keep the coded form if it renders back to the same text
+                if NOTE_EVENTS[code][1](self, arg) == note:
+                    return code, arg
+                break
+        self._note_texts = (self._note_texts or ()) + (note,)
+        return NOTE_TEXT, len(self._note_texts) - 1
+
+
+# ============= FAKE DATABASE =============
+TECH_ISSUES = {
+    "wifi": "Restart router, check if other devices connect, verify password",
+    "app": "Clear cache, update app to latest version, reinstall if needed",
+    "slow": "Close background apps, check storage space, restart device",
+    "login": "Reset password via email, clear browser cookies, check caps lock",
+}
+
+class FakeDatabase:
+    """Simulates customer and order database"""
+    
+    def __init__(self):
+        self.customers = {
+            "CUST001": {"name": "Alice Johnson", "tier": "premium", "balance": -45.99},
+            "CUST002": {"name": "Bob Smith", "tier": "standard", "balance": 0.0},
+            "CUST003": {"name": "Carol White", "tier": "premium", "balance": 150.00},
+            "CUST004": {"name": "David Brown", "tier": "standard", "balance": -120.50},
+            "CUST005": {"name": "Emma Davis", "tier": "premium", "balance": 25.00},
+            "CUST006": {"name": "Frank Miller", "tier": "standard", "balance": -75.00},
+            "CUST007": {"name": "Grace Wilson", "tier": "premium", "balance": 0.0},
+            "CUST008": {"name": "Henry Taylor", "tier": "standard", "balance": -200.00},
+        }
+        
+        self.orders = {
+            "ORD12345": {"customer": "CUST001", "status": "delivered", "item": "Laptop", "date": "2024-11-15"},
+            "ORD12346": {"customer": "CUST002", "status": "in_transit", "item": "Headphones", "date": "2024-12-10"},
+            "ORD12347": {"customer": "CUST003", "status": "delivered", "item": "Keyboard", "date": "2024-12-01"},
+            "ORD12348": {"customer": "CUST005", "status": "processing", "item": "Monitor", "date": "2024-12-15"},
+            "ORD12349": {"customer": "CUST006", "status": "delivered", "item": "Mouse", "date": "2024-11-20"},
+            "ORD12350": {"customer": "CUST007", "status": "in_transit", "item": "Webcam", "date": "2024-12-12"},
+            "ORD12351": {"customer": "CUST008", "status": "delivered", "item": "Speakers", "date": "2024-11-10"},
+        }
+        
+        self.tech_issues = dict(TECH_ISSUES)
+        self._listeners = []
+    
+    def add_listener(self, callback):
+        """Call callback(kind, record_id) whenever a customer or order record changes"""
+        self._listeners.append(callback)
+    
+    def update_customer(self, customer_id: str, **changes):
+        self.customers[customer_id] = {**self.get_customer(customer_id), **changes}
+        for callback in self._listeners:
+            callback("customer", customer_id)
+    
+    def update_order(self, order_id: str, **changes):
+        self.orders[order_id] = {**self.orders.get(order_id, {}), **changes}
+        for callback in self._listeners:
+            callback("order", order_id)
+    
+    def get_customer(self, customer_id: str) -> dict:
+        return self.customers.get(customer_id, {"name": "Unknown", "tier": "standard", "balance": 0.0})
+    
+    def get_order(self, order_id: str) -> dict:
+        return self.orders.get(order_id, {"error": "Order not found"})
+    
+    def get_customers(self, customer_ids) -> dict:
+        return {customer_id: self.get_customer(customer_id) for customer_id in customer_ids}
+    
+    def get_orders(self, order_ids) -> dict:
+        return {order_id: self.get_order(order_id) for order_id in order_ids}
+    
+    def get_tech_solution(self, issue_key: str) -> str:
+        return self.tech_issues.get(issue_key, "Please contact advanced technical support")
+
+
+class SQLiteDatabase:
+    """SQLite-backed customer and order store with the same lookups as FakeDatabase
+    
+    Runs in WAL mode so many workers can read while a loader writes. Each
+    thread (and each forked process) gets its own connection.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS customers (
+            customer_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            balance REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id TEXT PRIMARY KEY,
+            customer TEXT NOT NULL,
+            status TEXT NOT NULL,
+            item TEXT NOT NULL,
+            date TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders (customer);
+        CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status);
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.tech_issues = dict(TECH_ISSUES)
+        self._listeners = []
+        self._local = threading.local()
+        self._connection().executescript(self.SCHEMA)
+    
+    def add_listener(self, callback):
+        """Call callback(kind, record_id) whenever this process changes a customer or order record"""
+        self._listeners.append(callback)
+    
+    def update_customer(self, customer_id: str, **changes):
+        customer = {**self.get_customer(customer_id), **changes}
+        self.load_customers([{"customer_id": customer_id, **customer}])
+        for callback in self._listeners:
+            callback("customer", customer_id)
+    
+    def update_order(self, order_id: str, **changes):
+        order = self.get_order(order_id)
+        order = {**({} if "error" in order else order), **changes}
+        self.load_orders([{"order_id": order_id, **order}])
+        for callback in self._listeners:
+            callback("order", order_id)
+    
+    def __getstate__(self):
+        # Connections can't cross process boundaries; workers reopen the file
+        return {"path": self.path}
+    
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+    
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+    
+    def get_customer(self, customer_id: str) -> dict:
+        row = self._connection().execute(
+            "SELECT name, tier, balance FROM customers WHERE customer_id = ?", (customer_id,)).fetchone()
+        if row is None:
+            return {"name": "Unknown", "tier": "standard", "balance": 0.0}
+        return {"name": row[0], "tier": row[1], "balance": row[2]}
+    
+    def get_order(self, order_id: str) -> dict:
+        row = self._connection().execute(
+            "SELECT customer, status, item, date FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        if row is None:
+            return {"error": "Order not found"}
+        return {"customer": row[0], "status": row[1], "item": row[2], "date": row[3]}
+    
+    def get_customers(self, customer_ids) -> dict:
+        """Resolve many customers with one IN query per chunk of IDs"""
+        customers = {customer_id: {"name": "Unknown", "tier": "standard", "balance": 0.0} for customer_id in customer_ids}
+        for rows in self._select_in("SELECT customer_id, name, tier, balance FROM customers WHERE customer_id IN ({})", list(customers)):
+            for customer_id, name, tier, balance in rows:
+                customers[customer_id] = {"name": name, "tier": tier, "balance": balance}
+        return customers
+    
+    def get_orders(self, order_ids) -> dict:
+        """Resolve many orders with one IN query per chunk of IDs"""
+        orders = {order_id: {"error": "Order not found"} for order_id in order_ids}
+        for rows in self._select_in("SELECT order_id, customer, status, item, date FROM orders WHERE order_id IN ({})", list(orders)):
+            for order_id, customer, status, item, date in rows:
+                orders[order_id] = {"customer": customer, "status": status, "item": item, "date": date}
+        return orders
+    
+    def get_tech_solution(self, issue_key: str) -> str:
+        return self.tech_issues.get(issue_key, "Please contact advanced technical support")
+    
+    def _select_in(self, sql: str, keys: list, chunk_size: int = 900):
+        # Stay below SQLite's default limit on bound parameters per statement
+        connection = self._connection()
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start:start + chunk_size]
+            yield connection.execute(sql.format(", ".join("?" * len(chunk))), chunk).fetchall()
+    
+    def count_customers(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+    
+    def count_orders(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+    
+    def load_customers(self, records, batch_size: int = 50000) -> int:
+        """Bulk-insert customer records (customer_id, name, tier, balance), returning the count"""
+        rows = ((r["customer_id"], r["name"], r["tier"], float(r["balance"])) for r in records)
+        return self._load("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?)", rows, batch_size)
+    
+    def load_orders(self, records, batch_size: int = 50000) -> int:
+        """Bulk-insert order records (order_id, customer, status, item, date), returning the count"""
+        rows = ((r["order_id"], r["customer"], r["status"], r["item"], r["date"]) for r in records)
+        return self._load("INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?)", rows, batch_size)
+    
+    def load_fixture(self, path: str, kind: str) -> int:
+        """Bulk-load a CSV or JSONL fixture file of "customers" or "orders" """
+        loader = {"customers": self.load_customers, "orders": self.load_orders}[kind]
+        return loader(read_fixture(path))
+    
+    def import_database(self, source: FakeDatabase):
+        """Copy every customer and order from an in-memory database"""
+        self.load_customers({"customer_id": customer_id, **customer} for customer_id, customer in source.customers.items())
+        self.load_orders({"order_id": order_id, **order} for order_id, order in source.orders.items())
+    
+    def _load(self, sql: str, rows, batch_size: int) -> int:
+        connection = self._connection()
+        count = 0
+        with connection:
+            while batch := list(itertools.islice(rows, batch_size)):
+                connection.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+
+def read_fixture(path: str):
+    """Lazily yield records from a .csv (with header row) or .jsonl fixture file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(f)
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# ============= BATCH PREFETCH =============
+# Before a batch enters the graph, every customer and order it mentions is
+# resolved with one bulk query into a LookupCache; while the cache is active,
+# the agent nodes read from it instead of querying the store per ticket.
+_active_lookups = contextvars.ContextVar("active_lookups", default=None)
+
+
+def order_reference(query: str):
+    """Return the first ORD* token in a query, or None"""
+    for word in query.split():
+        if word.startswith("ORD"):
+            return word
+    return None
+
+
+class LookupCache:
+    """Per-batch customer and order records, falling back to the store on a miss"""
+    
+    def __init__(self, source, customers: dict, orders: dict):
+        self.source = source
+        self.customers = customers
+        self.orders = orders
+        self.hits = 0
+        self.misses = 0
+        self._tokens = []
+    
+    @property
+    def tech_issues(self) -> dict:
+        return self.source.tech_issues
+    
+    def get_customer(self, customer_id: str) -> dict:
+        customer = self.customers.get(customer_id)
+        if customer is None:
+            self.misses += 1
+            customer = self.customers[customer_id] = self.source.get_customer(customer_id)
+        else:
+            self.hits += 1
+        return customer
+    
+    def get_order(self, order_id: str) -> dict:
+        order = self.orders.get(order_id)
+        if order is None:
+            self.misses += 1
+            order = self.orders[order_id] = self.source.get_order(order_id)
+        else:
+            self.hits += 1
+        return order
+    
+    def get_tech_solution(self, issue_key: str) -> str:
+        return self.source.get_tech_solution(issue_key)
+    
+    def __enter__(self):
+        self._tokens.append(_active_lookups.set(self))
+        return self
+    
+    def __exit__(self, *exc_info):
+        _active_lookups.reset(self._tokens.pop())
+
+
+def prefetch(queries: list, source=None) -> LookupCache:
+    """Resolve all customers and ORD* references in a batch of tickets in bulk"""
+    source = source if source is not None else db
+    customer_ids = {query_data["customer_id"] for query_data in queries}
+    order_ids = {order_reference(query_data["query"]) for query_data in queries} - {None}
+    return LookupCache(source, source.get_customers(customer_ids), source.get_orders(order_ids))
+
+
+def data_source():
+    """The active batch LookupCache, or the database itself outside a batch"""
+    lookups = _active_lookups.get()
+    return lookups if lookups is not None else db
+
+
+def peek_customer(customer_id: str) -> dict:
+    """A customer record for bookkeeping (cache keys, statistics)
+    
+    Served from the active batch cache when it holds the customer, but never
+    counted as a lookup hit or miss, so the counters reflect the nodes only.
+    """
+    lookups = _active_lookups.get()
+    if lookups is None:
+        return db.get_customer(customer_id)
+    customer = lookups.customers.get(customer_id)
+    return customer if customer is not None else lookups.source.get_customer(customer_id)
+
+
+def peek_order(order_id: str) -> dict:
+    """An order record for bookkeeping, not counted as a lookup (see peek_customer)"""
+    lookups = _active_lookups.get()
+    if lookups is None:
+        return db.get_order(order_id)
+    order = lookups.orders.get(order_id)
+    return order if order is not None else lookups.source.get_order(order_id)
+
+
+# ============= POLICY RETRIEVAL =============
+class PolicyRetriever:
+    """Simulates policy document retrieval"""
+    
+    def __init__(self):
+        self.policies = {
+            "return_policy": {
+                "window": "30 days",
+                "conditions": "unused and in original packaging",
+                "refund_time": "5-7 business days",
+                "premium_shipping": "free",
+                "standard_shipping": "$5.99"
+            },
+            "billing_policy": {
+                "due_days": 15,
+                "initial_late_fee": 10,
+                "recurring_late_fee": 5,
+                "payment_plan_threshold": 100
+            },
+            "tech_support_policy": {
+                "premium_response": "2 hours",
+                "standard_response": "24 hours"
+            }
+        }
+    
+    def get_policy(self, policy_type: str) -> dict:
+        return self.policies.get(policy_type, {})
+
+
+# ============= KEYWORD LEXICON =============
+# Intent keywords in precedence order: the first intent with a hit wins
+INTENT_KEYWORDS = {
+    "returns": ["return", "refund", "send back", "wrong item"],
+    "billing": ["charge", "bill", "payment", "balance", "fee"],
+    "tech_support": ["not working", "broken", "crash", "error", "fix", "help", "troubleshoot", "wifi", "disconnect"],
+    "order_status": ["where", "status", "tracking", "order", "arrived", "delivery"],
+}
+HIGH_PRIORITY_WORDS = ["immediately", "urgent", "angry", "ridiculous", "terrible"]
+NEGATIVE_WORDS = ["terrible", "awful", "horrible", "angry", "furious", "ridiculous",
+                  "unacceptable", "disgusted", "worst", "never", "hate"]
+POSITIVE_WORDS = ["thanks", "thank you", "please", "appreciate", "grateful", "good"]
+URGENT_WORDS = ["immediately", "urgent", "asap", "now", "emergency"]
+# Response quality indicators checked by SentimentAnalyzer.analyze_response
+RESPONSE_QUALITY_KEYWORDS = {
+    "apology": ["apology", "apologize", "sorry"],
+    "solution": ["steps", "process", "how to", "options"],
+    "timeline": ["within", "days", "hours", "shortly"],
+    "politeness": ["please", "thank you", "appreciate"],
+}
+
+
+def _trie_regex(terms) -> str:
+    """Build a regex alternation shaped like a prefix trie of the given terms.
+    
+    Shared prefixes are matched once and longer terms are preferred, so the
+    regex engine walks the text like a keyword automaton.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    
+    def emit(node: dict) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+    
+    return emit(trie)
+
+
+class KeywordLexicon:
+    """Keyword matcher compiled once and shared by every node.
+    
+    A single scan of the lowercased text reports every keyword it contains,
+    grouped by category, with the same substring semantics as `word in text`.
+    Scans are memoized so the nodes handling one ticket share a single walk.
+    The regex is compiled on the first scan rather than at import.
+    """
+    
+    def __init__(self, groups: dict, cache_size: int = 4096):
+        self.groups = {category: tuple(term.lower() for term in terms) for category, terms in groups.items()}
+        self._categories = {}
+        for category, terms in self.groups.items():
+            for term in terms:
+                if term and category not in self._categories.setdefault(term, ()):
+                    self._categories[term] += (category,)
+        
+        # The regex reports the longest keyword starting at each position;
+        # shorter keywords that are prefixes of it start there too
+        self.terms = tuple(self._categories)
+        self.max_term_length = max(map(len, self.terms), default=0)
+        self._term_ids = {term: i for i, term in enumerate(self.terms)}
+        self.scan = functools.lru_cache(maxsize=cache_size)(self._scan)
+    
+    @functools.cached_property
+    def _matcher(self) -> tuple:
+        """(compiled regex, {longest match: every keyword it implies})"""
+        implied = {term: tuple(t for t in self.terms if term.startswith(t)) for term in self.terms}
+        return re.compile(f"(?=({_trie_regex(self.terms)}))"), implied
+    
+    def _matched_terms(self, text: str) -> set:
+        pattern, implied = self._matcher
+        matched = set()
+        for match in pattern.finditer(text.lower()):
+            matched.update(implied[match.group(1)])
+        return matched
+    
+    def _scan(self, text: str) -> MappingProxyType:
+        """Return {category: frozenset of matched keywords} for the text"""
+        hits = {category: set() for category in self.groups}
+        for term in self._matched_terms(text):
+            for category in self._categories[term]:
+                hits[category].add(term)
+        return MappingProxyType({category: frozenset(terms) for category, terms in hits.items()})
+    
+    def matched_categories(self, text: str) -> frozenset:
+        """Return the categories with at least one keyword in the text (not memoized)"""
+        return frozenset(category for term in self._matched_terms(text) for category in self._categories[term])
+    
+    def hit_matrix(self, texts: list):
+        """Return a (len(texts), len(self.terms)) uint8 NumPy matrix of keyword hits"""
+        import numpy as np
+        
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for term in self._matched_terms(text):
+                rows.append(row)
+                cols.append(self._term_ids[term])
+        matrix = np.zeros((len(texts), len(self.terms)), dtype=np.uint8)
+        matrix[rows, cols] = 1
+        return matrix
+    
+    def membership(self, category: str):
+        """Return a (len(self.terms),) uint8 NumPy vector marking the category's keywords"""
+        import numpy as np
+        
+        return np.array([category in self._categories[term] for term in self.terms], dtype=np.uint8)
+
+
+# ============= RESPONSE TEMPLATES =============
+# Each response is a two-level format string: single-brace fields are static
+# per template variant (tier, policy terms, order status) and are filled once
+# into a cached skeleton; double-brace fields are the per-customer values
+# spliced into that skeleton on every call.
+BILLING_OWED_TEMPLATE = """Dear {{name}},
+
+Thank you for contacting us regarding your billing concern.
+
+**Current Account Status:**
+- Account Balance: ${{amount:.2f}} (amount owed)
+- Account Tier: {tier_title}
+
+I understand you have questions about the charges on your account. Let me provide some clarity:
+
+**Our Billing Policy:**
+- Payment is due within {due_days} days of invoice
+- Initial late fee: ${initial_late_fee} after the due date
+- Additional fees: ${recurring_late_fee} per week thereafter
+
+**Available Options:**
+1. Make a one-time payment to clear your balance
+2. Set up a payment plan (available for balances over ${payment_plan_threshold})
+3. Contact us to discuss your specific situation
+
+If you believe there has been an error, please provide:
+- Date of your payment
+- Payment confirmation number
+- Any relevant documentation
+
+We're here to help resolve this fairly and quickly.
+
+Best regards,
+Billing Support Team"""
+
+BILLING_CREDIT_TEMPLATE = """Dear {{name}},
+
+Thank you for reaching out about your billing.
+
+**Current Account Status:**
+- Account Balance: ${{amount:.2f}} (credit)
+- Account Tier: {tier_title}
+
+Your account is in good standing! Is there a specific billing question I can help you with?
+
+Best regards,
+Billing Support Team"""
+
+TECH_TEMPLATE = """Hi {{name}},
+
+I'd be happy to help you resolve your technical issue! As a {tier} member, you have access to our technical support with {response_time} response time.
+
+**Troubleshooting Steps:**
+
+{{tech_solution}}
+
+**Additional Recommendations:**
+- Ensure your device/app is updated to the latest version
+- Check your internet connection if the issue is online
+- Restart your device after making changes
+
+**Next Steps:**
+Please try these troubleshooting steps and let us know if the issue persists. If you continue to experience problems:
+- Reply to this email with details of what you've tried
+- Include any error messages you're seeing
+- Our team will prioritize your case
+
+We're committed to getting you back up and running quickly!
+
+Best regards,
+Technical Support Team"""
+
+RETURNS_TEMPLATE = """Dear {{name}},
+
+I sincerely apologize for any issues with your order. I'm here to help you with the return process.
+
+**Return Policy:**
+- Return window: {window} from delivery
+- Condition required: {conditions}
+- Refund processing: {refund_time}
+- Return shipping: {shipping_cost} for {tier} members
+
+**How to Return Your Item:**
+
+1. **Initiate Return:** We'll email you a return authorization within 24 hours
+2. **Pack the Item:** Use original packaging if possible
+3. **Ship It Back:** Use the prepaid label we provide (or arrange your own shipping)
+4. **Get Your Refund:** Once we receive and inspect the item, your refund will be processed
+
+**What We Need From You:**
+- Order number (if available)
+- Reason for return
+- Photos of the item (if damaged or incorrect)
+
+I've flagged your case for priority processing. You should receive your return instructions within 24 hours.
+
+We value your business and want to make this right.
+
+Best regards,
+Returns Department"""
+
+ORDER_STATUS_MESSAGES = {
+    "delivered": "Great news! Your {item} was delivered. If you haven't received it, please check with your building management or neighbors.",
+    "in_transit": "Your {item} is currently on its way to you! Expected delivery is within 2-3 business days.",
+    "processing": "Your {item} order is being prepared for shipment. It should ship within 1-2 business days.",
+}
+
+ORDER_TEMPLATE = """Hi {{name}},
+
+Thank you for reaching out about your order!
+
+**Order Details:**
+- Item: {{item}}
+- Order Date: {{date}}
+- Status: {status_title}
+
+{status_message}
+
+**Tracking Information:**
+You'll receive email updates at each stage:
+- Order confirmation (sent)
+- Shipment notification (with tracking number)
+- Delivery confirmation
+
+If you have any concerns or don't receive your order within the expected timeframe, please don't hesitate to contact us again.
+
+Is there anything else I can help you with?
+
+Best regards,
+Customer Support Team"""
+
+GENERAL_TEMPLATE = """Hi {{name}},
+
+Thank you for contacting us!
+
+I'm here to help with your inquiry. To provide you with the most accurate information, could you please provide:
+- Your order number (if this is order-related)
+- A brief description of what you need assistance with
+- Any relevant dates or details
+
+Our team is committed to resolving your concern as quickly as possible.
+
+Best regards,
+Customer Support Team"""
+
+
+def _literal(value) -> str:
+    """Escape a static value so it survives the second formatting pass"""
+    return str(value).replace("{", "{{").replace("}", "}}")
+
+
+class RenderedResponse(str):
+    """A rendered template response carrying its precomputed quality flags
+    
+    It also keeps the template, variant and fields it was rendered from, so
+    the response can be rendered again for another customer.
+    """
+    
+    quality_flags: frozenset
+    template: str
+    variant: tuple
+    fields: dict
+
+
+class TemplateEngine:
+    """Renders responses from skeletons pre-rendered once per template variant
+    
+    Each skeleton's response-quality flags (see RESPONSE_QUALITY_KEYWORDS) are
+    computed once from its static text. On render only the spliced fields and
+    the few characters around them are scanned, and the flags travel with the
+    response so the sentiment check doesn't rescan it.
+    """
+    
+    def __init__(self):
+        self._skeletons = {}
+        self.render_counts = Counter()
+        self.render_seconds = Counter()
+    
+    def _compile(self, skeleton: str) -> tuple:
+        pieces = [(literal, field, spec) for literal, field, spec, _ in string.Formatter().parse(skeleton)]
+        static_flags = frozenset().union(*(response_lexicon.matched_categories(literal) for literal, _, _ in pieces))
+        return pieces, static_flags
+    
+    def render(self, template: str, variant: tuple, build, **fields) -> RenderedResponse:
+        """Splice per-customer fields into the skeleton for (template, *variant)
+        
+        build() is only called the first time a variant is seen.
+        """
+        started = time.perf_counter()
+        key = (template, *variant)
+        compiled = self._skeletons.get(key)
+        if compiled is None:
+            compiled = self._skeletons[key] = self._compile(build())
+        pieces, flags = compiled
+        
+        parts = []
+        spans = []
+        length = 0
+        for literal, field, spec in pieces:
+            parts.append(literal)
+            length += len(literal)
+            if field is not None:
+                value = format(fields[field], spec)
+                parts.append(value)
+                spans.append((length, length + len(value)))
+                length += len(value)
+        response = RenderedResponse("".join(parts))
+        
+        # A keyword that isn't wholly inside static text must overlap a field
+        margin = response_lexicon.max_term_length - 1
+        for start, end in spans:
+            flags = flags | response_lexicon.matched_categories(response[max(0, start - margin):end + margin])
+        response.quality_flags = flags
+        response.template, response.variant, response.fields = template, variant, fields
+        
+        self.render_seconds[template] += time.perf_counter() - started
+        self.render_counts[template] += 1
+        return response
+    
+    def stats(self) -> dict:
+        """Return {template: (renders, seconds spent rendering)} since the last take()"""
+        return {template: (count, self.render_seconds[template]) for template, count in self.render_counts.items()}
+    
+    def take(self) -> Counter:
+        """Return the render totals as run counters and zero them, for merging across workers"""
+        counts, seconds = self.render_counts, self.render_seconds
+        self.render_counts, self.render_seconds = Counter(), Counter()
+        return Counter(template_renders=sum(counts.values()), template_render_seconds=sum(seconds.values()))
+
+
+template_engine = TemplateEngine()
+
+
+class ResponseTemplates:
+    """Template-based response generator"""
+    
+    # policy_key is the policy's contents as a render-cache key, for callers
+    # that hold a policy for the life of the process (see BILLING_POLICY)
+    @staticmethod
+    def generate_billing_response(customer: dict, policy: dict, query: str, policy_key: tuple = None) -> str:
+        name = customer.get('name', 'Valued Customer')
+        tier = customer.get('tier', 'standard')
+        balance = customer.get('balance', 0.0)
+        owed = balance < 0
+        
+        def build():
+            template = BILLING_OWED_TEMPLATE if owed else BILLING_CREDIT_TEMPLATE
+            return template.format(
+                tier_title=_literal(tier.capitalize()),
+                due_days=_literal(policy.get('due_days', 15)),
+                initial_late_fee=_literal(policy.get('initial_late_fee', 10)),
+                recurring_late_fee=_literal(policy.get('recurring_late_fee', 5)),
+                payment_plan_threshold=_literal(policy.get('payment_plan_threshold', 100)),
+            )
+        
+        if policy_key is None:
+            policy_key = tuple(policy.items())
+        return template_engine.render("billing", (tier, owed, policy_key), build,
+                                      name=name, amount=abs(balance) if owed else balance)
+    
+    @staticmethod
+    def generate_tech_response(customer: dict, tech_solution: str, query: str) -> str:
+        name = customer.get('name', 'Valued Customer')
+        tier = customer.get('tier', 'standard')
+        
+        def build():
+            policy = policy_retriever.get_policy("tech_support_policy")
+            return TECH_TEMPLATE.format(tier=_literal(tier), response_time=_literal(policy.get(f'{tier}_response', '24 hours')))
+        
+        return template_engine.render("tech", (tier,), build, name=name, tech_solution=tech_solution)
+    
+    @staticmethod
+    def generate_returns_response(customer: dict, policy: dict, query: str, policy_key: tuple = None) -> str:
+        name = customer.get('name', 'Valued Customer')
+        tier = customer.get('tier', 'standard')
+        
+        def build():
+            return RETURNS_TEMPLATE.format(
+                window=_literal(policy.get('window', '30 days')),
+                conditions=_literal(policy.get('conditions', 'unused in original packaging')),
+                refund_time=_literal(policy.get('refund_time', '5-7 business days')),
+                shipping_cost=_literal(policy.get(f'{tier}_shipping', '$5.99')),
+                tier=_literal(tier),
+            )
+        
+        if policy_key is None:
+            policy_key = tuple(policy.items())
+        return template_engine.render("returns", (tier, policy_key), build, name=name)
+    
+    @staticmethod
+    def generate_general_response(customer: dict, order_info: dict = None, query: str = "") -> str:
+        name = customer.get('name', 'Valued Customer')
+        
+        if order_info and "error" not in order_info:
+            status = order_info.get('status', 'unknown')
+            item = order_info.get('item', 'your item')
+            date = order_info.get('date', 'recently')
+            
+            def build():
+                # The status message is static per status, except for the item
+                status_message = ORDER_STATUS_MESSAGES.get(status)
+                if status_message is None:
+                    status_message = _literal('Your order is being processed.')
+                else:
+                    status_message = _literal(status_message).replace("{{item}}", "{item}")
+                return ORDER_TEMPLATE.format(status_title=_literal(status.replace('_', ' ').title()),
+                                             status_message=status_message)
+            
+            return template_engine.render("order_status", (status,), build, name=name, item=item, date=date)
+        else:
+            return template_engine.render("general", (), lambda: GENERAL_TEMPLATE.format(), name=name)
+    
+    @staticmethod
+    def respond_like(response: RenderedResponse, customer: dict, order_info: dict = None) -> RenderedResponse:
+        """Render another ticket's response again for this customer and order
+        
+        Only the name, amount, item and date fields change. Returns None when
+        the customer or order needs a different skeleton (tier, whether the
+        balance is owed, order status, or whether an order was found).
+        """
+        template, variant = response.template, response.variant
+        tier = customer.get('tier', 'standard')
+        balance = customer.get('balance', 0.0)
+        fields = {**response.fields, "name": customer.get('name', 'Valued Customer')}
+        has_order = bool(order_info and "error" not in order_info)
+        
+        if template == "billing":
+            owed = balance < 0
+            fields["amount"] = abs(balance) if owed else balance
+            expected = (tier, owed, variant[2])
+        elif template == "tech":
+            expected = (tier,)
+        elif template == "returns":
+            expected = (tier, variant[1])
+        elif template == "order_status" and has_order:
+            fields["item"] = order_info.get('item', 'your item')
+            fields["date"] = order_info.get('date', 'recently')
+            expected = (order_info.get('status', 'unknown'),)
+        elif template == "general" and not has_order:
+            expected = ()
+        else:
+            return None
+        if expected != variant:
+            return None
+        return template_engine.render(template, variant, None, **fields)
+
+
+# ============= SENTIMENT ANALYZER =============
+class SentimentAnalyzer:
+    """Rule-based sentiment analysis"""
+    
+    @staticmethod
+    def analyze_query(query: str) -> float:
+        """Analyze customer query sentiment (0.0 = very negative, 1.0 = very positive)"""
+        hits = lexicon.scan(query)
+        
+        # Negative, positive and urgency indicators
+        neg_count = len(hits["negative"])
+        pos_count = len(hits["positive"])
+        urgent_count = len(hits["urgent"])
+        
+        # Base sentiment
+        base_score = 0.7
+        
+        # Adjust for negative/positive words
+        sentiment = base_score - (neg_count * 0.15) + (pos_count * 0.1) - (urgent_count * 0.1)
+        
+        # Clamp between 0 and 1
+        return max(0.0, min(1.0, sentiment))
+    
+    @staticmethod
+    def analyze_response(response: str, query_sentiment: float, quality_flags: frozenset = None) -> float:
+        """Analyze response quality based on response content and query sentiment
+        
+        quality_flags are the RESPONSE_QUALITY_KEYWORDS categories present in
+        the response, as carried by a RenderedResponse; free-form text without
+        them is scanned in full.
+        """
+        if quality_flags is None:
+            quality_flags = getattr(response, "quality_flags", None)
+        if quality_flags is None:
+            quality_flags = response_lexicon.matched_categories(response)
+        
+        # Quality indicators
+        has_apology = "apology" in quality_flags
+        has_solution = "solution" in quality_flags
+        has_timeline = "timeline" in quality_flags
+        is_polite = "politeness" in quality_flags
+        
+        base_quality = 0.75
+        
+        if has_apology and query_sentiment < 0.6:
+            base_quality += 0.1
+        if has_solution:
+            base_quality += 0.1
+        if has_timeline:
+            base_quality += 0.05
+        if is_polite:
+            base_quality += 0.05
+        
+        return min(1.0, base_quality)
+
+
+# ============= INITIALIZE TOOLS =============
+db = FakeDatabase()
+policy_retriever = PolicyRetriever()
+response_generator = ResponseTemplates()
+sentiment_analyzer = SentimentAnalyzer()
+
+# Policies are static for the life of the process, so the agents resolve
+# theirs once here, along with their render-cache keys
+BILLING_POLICY = policy_retriever.get_policy("billing_policy")
+BILLING_POLICY_KEY = tuple(BILLING_POLICY.items())
+RETURN_POLICY = policy_retriever.get_policy("return_policy")
+RETURN_POLICY_KEY = tuple(RETURN_POLICY.items())
+
+
+def use_database(database):
+    """Switch the customer/order store every agent node reads from"""
+    global db
+    db = database
+
+
+lexicon = KeywordLexicon({
+    **INTENT_KEYWORDS,
+    "high_priority": HIGH_PRIORITY_WORDS,
+    "negative": NEGATIVE_WORDS,
+    "positive": POSITIVE_WORDS,
+    "urgent": URGENT_WORDS,
+    "tech_issue": list(db.tech_issues),
+})
+response_lexicon = KeywordLexicon(RESPONSE_QUALITY_KEYWORDS, cache_size=0)
+
+
+# ============= SAMPLE QUERIES =============
+SAMPLE_QUERIES = [
+    {
+        "customer_id": "CUST001",
+        "query": "I received my laptop but it's not what I ordered. I want to return it and get a refund immediately!",
+    },
+    {
+        "customer_id": "CUST002",
+        "query": "My headphones haven't arrived yet. Where is my order ORD12346?",
+    },
+    {
+        "customer_id": "CUST004",
+        "query": "Why am I being charged late fees? This is ridiculous! I paid on time!",
+    },
+    {
+        "customer_id": "CUST003",
+        "query": "My WiFi keeps disconnecting. Can you help me troubleshoot?",
+    },
+    {
+        "customer_id": "CUST005",
+        "query": "When will my monitor ship? I ordered it 2 days ago and it's still processing.",
+    },
+    {
+        "customer_id": "CUST006",
+        "query": "The mouse I received is defective. The left click doesn't work properly.",
+    },
+    {
+        "customer_id": "CUST007",
+        "query": "My app keeps crashing every time I try to log in. Please help!",
+    },
+    {
+        "customer_id": "CUST008",
+        "query": "I can't afford to pay $200 right now. Can I set up a payment plan?",
+    },
+]
+
+
+# ============= NODE FUNCTIONS =============
+# The billing agent's note carries the customer's balance; near-duplicates
+# rewrite it for their own customer (see coalesce_ticket)
+BILLING_NOTE = "Billing agent handled query. Balance: ${balance}"
+
+
+def classify_intent(state: TicketState) -> TicketState:
+    """Classify the intent of the customer query"""
+    hits = lexicon.scan(state["query"])
+    
+    # Simple keyword-based classification
+    intent = next((name for name in INTENT_KEYWORDS if hits[name]), "general")
+    
+    # Determine priority based on sentiment and keywords
+    priority = "high" if hits["high_priority"] else "normal"
+    
+    state["intent"] = intent
+    state["priority"] = priority
+    state["resolution_notes"].append(f"Intent classified as: {intent} (Priority: {priority})")
+    
+    return state
+
+
+def route_to_agent(state: TicketState) -> Literal["billing_agent", "tech_agent", "returns_agent", "general_agent"]:
+    """Route to appropriate specialized agent"""
+    intent = state["intent"]
+    
+    routing = {
+        "billing": "billing_agent",
+        "tech_support": "tech_agent",
+        "returns": "returns_agent",
+        "order_status": "general_agent",
+        "general": "general_agent",
+    }
+    
+    return routing.get(intent, "general_agent")
+
+
+def billing_agent(state: TicketState) -> TicketState:
+    """Handle billing-related queries"""
+    customer = data_source().get_customer(state["customer_id"])
+    
+    response = response_generator.generate_billing_response(customer, BILLING_POLICY, state["query"],
+                                                            BILLING_POLICY_KEY)
+    
+    state["agent_response"] = response
+    state["resolution_notes"].append(BILLING_NOTE.format(balance=customer.get('balance', 0.0)))
+    
+    return state
+
+
+def tech_issue(query: str):
+    """Return the first known tech issue a query mentions, or None"""
+    issue_hits = lexicon.scan(query)["tech_issue"]
+    return next((issue_key for issue_key in data_source().tech_issues if issue_key in issue_hits), None)
+
+
+def tech_agent(state: TicketState) -> TicketState:
+    """Handle technical support queries"""
+    lookups = data_source()
+    customer = lookups.get_customer(state["customer_id"])
+    
+    # Try to find relevant tech solution
+    issue_key = tech_issue(state["query"])
+    tech_solution = lookups.get_tech_solution(issue_key) if issue_key else None
+    
+    if not tech_solution:
+        tech_solution = """1. Check if the issue occurs on other devices
+2. Restart the device/application
+3. Check for software updates
+4. Contact support if the issue persists"""
+    
+    response = response_generator.generate_tech_response(customer, tech_solution, state["query"])
+    
+    state["agent_response"] = response
+    state["resolution_notes"].append("Tech support agent provided troubleshooting steps")
+    
+    return state
+
+
+def returns_agent(state: TicketState) -> TicketState:
+    """Handle returns and refunds"""
+    customer = data_source().get_customer(state["customer_id"])
+    
+    response = response_generator.generate_returns_response(customer, RETURN_POLICY, state["query"],
+                                                            RETURN_POLICY_KEY)
+    
+    state["agent_response"] = response
+    state["resolution_notes"].append("Returns agent initiated return process")
+    
+    return state
+
+
+def general_agent(state: TicketState) -> TicketState:
+    """Handle general queries and order status"""
+    lookups = data_source()
+    customer = lookups.get_customer(state["customer_id"])
+    
+    # Check if query mentions an order ID
+    order_id = order_reference(state["query"])
+    order_info = lookups.get_order(order_id) if order_id else None
+    
+    response = response_generator.generate_general_response(customer, order_info, state["query"])
+    
+    state["agent_response"] = response
+    state["resolution_notes"].append("General agent handled query")
+    
+    return state
+
+
+def sentiment_checker(state: TicketState) -> TicketState:
+    """Analyze sentiment of the query and response quality"""
+    
+    # Analyze query sentiment
+    query_sentiment = sentiment_analyzer.analyze_query(state["query"])
+    
+    # Analyze response quality
+    response_quality = sentiment_analyzer.analyze_response(state["agent_response"], query_sentiment)
+    
+    state["sentiment_score"] = response_quality
+    
+    # Escalate if sentiment is poor or priority is high and sentiment is moderate
+    if response_quality < 0.6 or (state["priority"] == "high" and response_quality < 0.8):
+        state["escalated"] = True
+        state["resolution_notes"].append(f"⚠️  Escalated to human review (quality score: {response_quality:.2f}, query sentiment: {query_sentiment:.2f})")
+    else:
+        state["escalated"] = False
+        state["resolution_notes"].append(f"✓ Auto-approved (quality score: {response_quality:.2f})")
+    
+    return state
+
+
+def should_escalate(state: TicketState) -> Literal["human_review", "finalize"]:
+    """Decide whether to escalate to human review"""
+    return "human_review" if state["escalated"] else "finalize"
+
+
+def human_review(state: TicketState) -> TicketState:
+    """Simulate human review (adds note)"""
+    state["resolution_notes"].append("👤 ESCALATED: Human agent reviewing before sending")
+    state["final_response"] = "[PENDING HUMAN REVIEW]\n\n" + state["agent_response"]
+    return state
+
+
+def finalize_response(state: TicketState) -> TicketState:
+    """Finalize and approve response"""
+    state["final_response"] = state["agent_response"]
+    state["resolution_notes"].append("✓ Response approved and sent to customer")
+    return state
+
+
+# ============= BATCH CLASSIFICATION =============
+# Vectorized equivalents of classify_intent and SentimentAnalyzer.analyze_query
+# for reclassifying large backlogs; results match the scalar functions exactly.
+
+def score_batch(queries: list, hits=None):
+    """Return a float64 array of query sentiment scores, one per query"""
+    import numpy as np
+    
+    if hits is None:
+        hits = lexicon.hit_matrix(queries)
+    counts = hits.astype(np.int64)
+    neg_count = counts @ lexicon.membership("negative")
+    pos_count = counts @ lexicon.membership("positive")
+    urgent_count = counts @ lexicon.membership("urgent")
+    
+    # Same operation order as analyze_query so the floats are bit-identical
+    sentiment = 0.7 - (neg_count * 0.15) + (pos_count * 0.1) - (urgent_count * 0.1)
+    return np.clip(sentiment, 0.0, 1.0)
+
+
+def classify_batch(queries: list) -> dict:
+    """Classify many queries at once.
+    
+    Returns {"intent": array, "priority": array, "query_sentiment": array},
+    each aligned with the input queries.
+    """
+    import numpy as np
+    
+    hits = lexicon.hit_matrix(queries)
+    
+    # One column per intent in precedence order, plus an always-true "general"
+    intent_names = np.array(list(INTENT_KEYWORDS) + ["general"], dtype=object)
+    intent_hits = np.ones((len(queries), len(intent_names)), dtype=bool)
+    for column, name in enumerate(INTENT_KEYWORDS):
+        intent_hits[:, column] = (hits @ lexicon.membership(name)) > 0
+    
+    # argmax returns the first True column, i.e. the highest-precedence intent
+    intent = intent_names[intent_hits.argmax(axis=1)]
+    priority = np.where((hits @ lexicon.membership("high_priority")) > 0, "high", "normal").astype(object)
+    
+    return {
+        "intent": intent,
+        "priority": priority,
+        "query_sentiment": score_batch(queries, hits),
+    }
+
+
+# ============= RESPONSE CACHE =============
+# Repeat contacts (same customer, same question, same order) skip the agent
+# and sentiment nodes entirely. The key holds every input those nodes read,
+# so a hit returns exactly what the graph would have produced.
+CACHED_FIELDS = ("intent", "priority", "agent_response", "sentiment_score", "escalated",
+                 "resolution_notes", "final_response")
+
+
+class ResponseCache:
+    """Bounded LRU cache of graph results with TTL expiry
+    
+    Entries are tied to the customer and order records they were built from
+    and dropped when one of those records changes (see watch). Each process
+    keeps its own cache; pickling one carries only its settings.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_record = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    def __getstate__(self):
+        return {"max_entries": self.max_entries, "ttl": self.ttl}
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def watch(self, database) -> "ResponseCache":
+        """Invalidate entries whenever the database reports a changed record"""
+        database.add_listener(self.invalidate)
+        return self
+    
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._discard(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: tuple, value: dict, records: tuple):
+        """Store value under key, tied to (kind, record_id) records"""
+        with self._lock:
+            if key in self._entries:
+                self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, records)
+            for record in records:
+                self._keys_by_record[record].add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate(self, kind: str, record_id: str):
+        """Drop every entry built from the given customer or order record"""
+        with self._lock:
+            for key in self._keys_by_record.pop((kind, record_id), ()):
+                if key in self._entries:
+                    self._discard(key)
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_record.clear()
+    
+    def counters(self) -> Counter:
+        return Counter(cache_hits=self.hits, cache_misses=self.misses, cache_evictions=self.evictions,
+                       cache_expirations=self.expirations, cache_invalidations=self.invalidations)
+    
+    def _discard(self, key: tuple):
+        _, _, records = self._entries.pop(key)
+        for record in records:
+            keys = self._keys_by_record.get(record)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_record[record]
+
+
+def response_cache_key(state: TicketState) -> tuple:
+    """Return (key, records) for a new ticket: its normalized features and the records they came from"""
+    query = state["query"]
+    hits = lexicon.scan(query)
+    intent = next((name for name in INTENT_KEYWORDS if hits[name]), "general")
+    priority = "high" if hits["high_priority"] else "normal"
+    
+    customer_id = state["customer_id"]
+    customer = peek_customer(customer_id)
+    records = (("customer", customer_id),)
+    
+    agent = route_to_agent({"intent": intent})
+    issue_key = order_id = order_status = None
+    if agent == "tech_agent":
+        issue_key = tech_issue(query)
+    elif agent == "general_agent":
+        order_id = order_reference(query)
+        if order_id:
+            order_status = peek_order(order_id).get("status")
+            records += (("order", order_id),)
+    
+    key = (intent, priority, sentiment_analyzer.analyze_query(query), customer_id,
+           customer.get("tier"), customer.get("balance"), issue_key, order_id, order_status)
+    return key, records
+
+
+# ============= NEAR-DUPLICATE COALESCING =============
+# During an outage many customers report the same problem in slightly
+# different words. Tickets whose normalized text is near-identical (MinHash
+# estimate of word-bigram Jaccard similarity) within a sliding time window and
+# classify the same way form a cluster: the first one goes through the graph,
+# the rest reuse its result with their own customer and order spliced in.
+_ORDER_TOKEN = re.compile(r"\bord\w*")
+_NON_LETTERS = re.compile(r"[^a-z]+")
+AGENT_NODES = {
+    "billing_agent": billing_agent,
+    "tech_agent": tech_agent,
+    "returns_agent": returns_agent,
+    "general_agent": general_agent,
+}
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase a query and drop order numbers, digits and punctuation"""
+    return " ".join(_NON_LETTERS.sub(" ", _ORDER_TOKEN.sub(" ", query.lower())).split())
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, one multiply-shift hash per permutation
+
+    Each shingle's permuted hashes are computed once and memoized, so a
+    signature is an element-wise minimum over cached vectors. Signatures are
+    memoized too, since tickets often repeat word for word.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 2, seed: int = 1, cache_size: int = 65536):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._multipliers = rng.integers(1, 2**63, num_perm, dtype=np.uint64) | np.uint64(1)
+        self._offsets = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self._permuted = functools.lru_cache(maxsize=cache_size)(self._permute)
+        self.signature = functools.lru_cache(maxsize=cache_size)(self._signature)
+
+    def shingles(self, text: str) -> set:
+        size = self.shingle_size
+        words = text.split()
+        return {" ".join(words[start:start + size]) for start in range(max(1, len(words) - size + 1))}
+
+    def _permute(self, shingle: str):
+        import numpy as np
+        # uint64 arithmetic wraps, which is what multiply-shift hashing wants
+        mixed = self._multipliers * np.uint64(zlib.crc32(shingle.encode())) + self._offsets
+        return mixed >> np.uint64(32)
+
+    def _signature(self, text: str):
+        import numpy as np
+        return np.minimum.reduce([self._permuted(shingle) for shingle in self.shingles(text)])
+
+
+class NearDuplicateCluster:
+    """Tickets coalesced onto one representative, whose result is kept once it is done"""
+    __slots__ = ("representative", "signature", "created", "size", "intent", "priority", "band_keys", "result")
+
+    def __init__(self, representative: str, signature, created: float, band_keys: list,
+                 intent: str, priority: str):
+        self.representative = representative
+        self.signature = signature
+        self.created = created
+        self.size = 1
+        self.intent = intent
+        self.priority = priority
+        self.band_keys = band_keys
+        self.result = None
+
+
+class NearDuplicateIndex:
+    """Sliding-window LSH index that assigns incoming tickets to clusters
+
+    A classified ticket joins the most similar cluster created within the
+    last `window` seconds whose estimated similarity is at least `threshold`
+    and whose intent and priority match its own; otherwise it starts a new
+    cluster. Each process keeps its own index; pickling one carries only its
+    settings.
+    """
+
+    def __init__(self, threshold: float = 0.8, window: float = 600.0, num_perm: int = 64, bands: int = 16,
+                 max_clusters: int = 10000, clock=time.monotonic):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.window = window
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_clusters = max_clusters
+        self.clock = clock
+        self._hasher = MinHasher(num_perm)
+        self._rows = num_perm // bands
+        self._buckets = {}
+        self._clusters = deque()
+        self._lock = threading.Lock()
+        self.tickets = 0
+        self.clusters = 0
+        self.coalesced = 0
+        self.mismatched = 0
+        self.reused = 0
+        self.expired = 0
+        self.largest = 0
+
+    def __getstate__(self):
+        return {"threshold": self.threshold, "window": self.window, "num_perm": self.num_perm,
+                "bands": self.bands, "max_clusters": self.max_clusters}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def assign(self, state: TicketState) -> tuple:
+        """Return (cluster, similarity) for a classified ticket; a new cluster has size 1"""
+        import numpy as np
+        signature = self._hasher.signature(normalize_query(state["query"]))
+        packed, width = signature.tobytes(), self._rows * signature.itemsize
+        band_keys = [(band, packed[band * width:(band + 1) * width]) for band in range(self.bands)]
+        with self._lock:
+            now = self.clock()
+            self._expire(now)
+            self.tickets += 1
+            best, similarity, mismatched = None, 0.0, False
+            for cluster in dict.fromkeys(map(self._buckets.get, band_keys)):
+                if cluster is None:
+                    continue
+                estimate = np.count_nonzero(cluster.signature == signature) / self.num_perm
+                if estimate < self.threshold:
+                    continue
+                if (cluster.intent, cluster.priority) != (state["intent"], state["priority"]):
+                    mismatched = True
+                elif estimate > similarity:
+                    best, similarity = cluster, estimate
+            if best is not None:
+                best.size += 1
+                self.coalesced += 1
+                self.largest = max(self.largest, best.size)
+                return best, similarity
+            self.mismatched += mismatched
+            cluster = NearDuplicateCluster(state["ticket_id"], signature, now, band_keys,
+                                           state["intent"], state["priority"])
+            for key in band_keys:
+                self._buckets[key] = cluster
+            self._clusters.append(cluster)
+            self.clusters += 1
+            self.largest = max(self.largest, 1)
+            if len(self._clusters) > self.max_clusters:
+                self._drop(self._clusters.popleft())
+            return cluster, 1.0
+
+    def count_reused(self):
+        """Record a near-duplicate that reused its representative's result"""
+        with self._lock:
+            self.reused += 1
+
+    def active(self, limit: int = None) -> list:
+        """Clusters still open for new members, largest first"""
+        with self._lock:
+            self._expire(self.clock())
+            clusters = sorted(self._clusters, key=lambda cluster: -cluster.size)
+        return clusters[:limit]
+
+    def counters(self) -> Counter:
+        return Counter(dedup_tickets=self.tickets, dedup_clusters=self.clusters,
+                       dedup_coalesced=self.coalesced, dedup_mismatched=self.mismatched,
+                       dedup_reused=self.reused, dedup_expired=self.expired)
+
+    def _expire(self, now: float):
+        clusters = self._clusters
+        while clusters and clusters[0].created + self.window <= now:
+            self._drop(clusters.popleft())
+            self.expired += 1
+
+    def _drop(self, cluster: NearDuplicateCluster):
+        for key in cluster.band_keys:
+            if self._buckets.get(key) is cluster:
+                del self._buckets[key]
+
+
+def coalesce_ticket(state: TicketState, cluster: NearDuplicateCluster, similarity: float):
+    """Finish a classified near-duplicate from its cluster representative's result
+
+    The representative's response is rendered again with this ticket's
+    customer and order, and its score, escalation and notes are kept. Returns
+    None, and the ticket goes through the graph, while the representative is
+    still in flight or when this ticket would be answered differently: another
+    skeleton or tech issue, a different query sentiment, or response-quality
+    flags picked up from its own fields.
+    """
+    representative = cluster.result
+    if representative is None:
+        return None
+    query, original = state["query"], representative["query"]
+    if sentiment_analyzer.analyze_query(query) != sentiment_analyzer.analyze_query(original):
+        return None
+    agent = route_to_agent(state)
+    if agent == "tech_agent" and tech_issue(query) != tech_issue(original):
+        return None
+    
+    lookups = data_source()
+    customer = lookups.get_customer(state["customer_id"])
+    order_id = order_reference(query) if agent == "general_agent" else None
+    order_info = lookups.get_order(order_id) if order_id else None
+    previous = representative["agent_response"]
+    response = response_generator.respond_like(previous, customer, order_info)
+    if response is None or response.quality_flags != previous.quality_flags:
+        return None
+    
+    notes = list(representative["resolution_notes"][:-1])
+    if agent == "billing_agent":
+        notes[len(state["resolution_notes"])] = BILLING_NOTE.format(balance=customer.get('balance', 0.0))
+    notes.insert(0, f"Near-duplicate of {cluster.representative} (similarity {similarity:.2f})")
+    state = {**state, "agent_response": response, "sentiment_score": representative["sentiment_score"],
+             "escalated": representative["escalated"], "resolution_notes": notes}
+    return human_review(state) if should_escalate(state) == "human_review" else finalize_response(state)
+
+
+# ============= BUILD GRAPH =============
+
+def create_support_graph(engine: str = "langgraph", metrics: "NodeMetrics" = None):
+    """Create the LangGraph workflow
+    
+    engine="fast" returns a FastPathExecutor over the same nodes and routers
+    instead; both expose invoke() and ainvoke(). Pass a NodeMetrics to time
+    every node and router. Graphs without metrics keep no state of their
+    own, so each engine's is built once per process and shared.
+    """
+    if metrics is None:
+        return _shared_support_graph(engine)
+    return _build_support_graph(engine, metrics)
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_support_graph(engine: str):
+    return _build_support_graph(engine)
+
+
+def _build_support_graph(engine: str, metrics: "NodeMetrics" = None):
+    if engine == "fast":
+        return FastPathExecutor(metrics)
+    if engine != "langgraph":
+        raise ValueError(f"Unknown engine: {engine}")
+    
+    from langgraph.graph import StateGraph, END
+    
+    instrument = metrics.wrap if metrics is not None else (lambda name, function: function)
+    workflow = StateGraph(TicketState)
+    
+    # Add nodes
+    workflow.add_node("classify", instrument("classify", classify_intent))
+    workflow.add_node("billing_agent", instrument("billing_agent", billing_agent))
+    workflow.add_node("tech_agent", instrument("tech_agent", tech_agent))
+    workflow.add_node("returns_agent", instrument("returns_agent", returns_agent))
+    workflow.add_node("general_agent", instrument("general_agent", general_agent))
+    workflow.add_node("sentiment_check", instrument("sentiment_check", sentiment_checker))
+    workflow.add_node("human_review", instrument("human_review", human_review))
+    workflow.add_node("finalize", instrument("finalize", finalize_response))
+    
+    # Set entry point
+    workflow.set_entry_point("classify")
+    
+    # Add conditional routing from classify to agents
+    workflow.add_conditional_edges(
+        "classify",
+        instrument("route_to_agent", route_to_agent),
+        {
+            "billing_agent": "billing_agent",
+            "tech_agent": "tech_agent",
+            "returns_agent": "returns_agent",
+            "general_agent": "general_agent",
+        }
+    )
+    
+    # All agents go to sentiment check
+    workflow.add_edge("billing_agent", "sentiment_check")
+    workflow.add_edge("tech_agent", "sentiment_check")
+    workflow.add_edge("returns_agent", "sentiment_check")
+    workflow.add_edge("general_agent", "sentiment_check")
+    
+    # Conditional routing based on sentiment
+    workflow.add_conditional_edges(
+        "sentiment_check",
+        instrument("should_escalate", should_escalate),
+        {
+            "human_review": "human_review",
+            "finalize": "finalize",
+        }
+    )
+    
+    # Both paths end after their final node
+    workflow.add_edge("human_review", END)
+    workflow.add_edge("finalize", END)
+    
+    return workflow.compile()
+
+
+# ============= FAST-PATH EXECUTOR =============
+# The support workflow is a fixed DAG, so it can also run as a direct call
+# chain without LangGraph's per-step channel bookkeeping
+ENGINES = ("langgraph", "fast")
+
+
+class FastPathExecutor:
+    """Runs the support graph's nodes and routers as a direct call chain
+    
+    classify -> route_to_agent -> agent -> sentiment_check -> should_escalate
+    -> human_review | finalize, with the same final state as the compiled
+    LangGraph workflow.
+    """
+    
+    def __init__(self, metrics: "NodeMetrics" = None):
+        self.nodes = {
+            "classify": classify_intent,
+            "billing_agent": billing_agent,
+            "tech_agent": tech_agent,
+            "returns_agent": returns_agent,
+            "general_agent": general_agent,
+            "sentiment_check": sentiment_checker,
+            "human_review": human_review,
+            "finalize": finalize_response,
+        }
+        self.route_to_agent = route_to_agent
+        self.should_escalate = should_escalate
+        if metrics is not None:
+            self.nodes = {name: metrics.wrap(name, node) for name, node in self.nodes.items()}
+            self.route_to_agent = metrics.wrap("route_to_agent", route_to_agent)
+            self.should_escalate = metrics.wrap("should_escalate", should_escalate)
+    
+    def invoke(self, state: TicketState) -> TicketState:
+        # Work on a copy, like the graph runtime, so the caller's state is untouched
+        state = {**state, "resolution_notes": list(state["resolution_notes"])}
+        nodes = self.nodes
+        state = nodes["classify"](state)
+        state = nodes[self.route_to_agent(state)](state)
+        state = nodes["sentiment_check"](state)
+        return nodes[self.should_escalate(state)](state)
+    
+    async def ainvoke(self, state: TicketState) -> TicketState:
+        # Nodes are synchronous; run them off the event loop so concurrent
+        # tickets overlap, as LangGraph does for sync nodes
+        return await asyncio.to_thread(self.invoke, state)
+
+
+def compare_engines(queries: list, repeat: int = 3) -> dict:
+    """Check that both engines agree on every query and time their per-ticket cost
+    
+    Returns {"tickets", "mismatches": [indices], "<engine>_us_per_ticket"}.
+    """
+    states = [new_ticket_state(query_data) for query_data in queries]
+    report = {"tickets": len(states)}
+    outputs = {}
+    
+    def fresh(state: TicketState) -> TicketState:
+        # LangGraph appends to the input's resolution_notes list in place
+        return {**state, "resolution_notes": []}
+    
+    for engine in ENGINES:
+        graph = create_support_graph(engine)
+        outputs[engine] = [graph.invoke(fresh(state)) for state in states]
+        best = float("inf")
+        for _ in range(repeat):
+            runs = [fresh(state) for state in states]
+            started = time.perf_counter()
+            for state in runs:
+                graph.invoke(state)
+            best = min(best, time.perf_counter() - started)
+        report[f"{engine}_us_per_ticket"] = best / max(len(states), 1) * 1e6
+    report["mismatches"] = [i for i, (expected, actual) in enumerate(zip(*outputs.values())) if expected != actual]
+    return report
+
+
+# ============= METRICS =============
+# Opt-in per-node timing. Counters live in arrays sized when a node is
+# wrapped, so recording a call only bumps existing slots.
+
+LATENCY_BUCKETS = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class NodeMetrics:
+    """Call counts and latency histograms for graph nodes and routers, plus the
+    escalation rate and intent distribution seen by the routers
+    
+    Pass one to create_support_graph(metrics=...) to instrument a graph.
+    Updates are not locked; share one instance between threads only if
+    slightly approximate counts are acceptable (the executors give each
+    worker its own and merge them).
+    """
+    
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.nodes = {}                                   # name -> slot
+        self._counts = []                                 # per slot: array of len(buckets) + 1 (+Inf)
+        self._seconds = array("d")                        # per slot: total seconds
+        self.intents = dict.fromkeys(filter(None, INTENT_CODES), 0)
+        self.tickets = 0
+        self.escalated = 0
+    
+    def _slot(self, name: str) -> int:
+        if name not in self.nodes:
+            self.nodes[name] = len(self._counts)
+            self._counts.append(array("q", bytes(8 * (len(self.buckets) + 1))))
+            self._seconds.append(0.0)
+        return self.nodes[name]
+    
+    def wrap(self, name: str, function):
+        """Return function timed under name; the routers also feed the ticket counters"""
+        slot = self._slot(name)
+        counts, seconds, buckets = self._counts[slot], self._seconds, self.buckets
+        perf_counter, bucket_of = time.perf_counter, bisect.bisect_left
+        
+        if name == "route_to_agent":
+            intents = self.intents
+            def observe(state, outcome):
+                intent = state["intent"]
+                intents[intent] = intents.get(intent, 0) + 1
+        elif name == "should_escalate":
+            def observe(state, outcome):
+                self.tickets += 1
+                self.escalated += outcome == "human_review"
+        else:
+            observe = None
+        
+        @functools.wraps(function)
+        def timed(state):
+            started = perf_counter()
+            outcome = function(state)
+            elapsed = perf_counter() - started
+            counts[bucket_of(buckets, elapsed)] += 1
+            seconds[slot] += elapsed
+            if observe is not None:
+                observe(state, outcome)
+            return outcome
+        return timed
+    
+    def calls(self, name: str) -> int:
+        return sum(self._counts[self.nodes[name]]) if name in self.nodes else 0
+    
+    def percentile(self, name: str, q: float) -> float:
+        """Estimate the q-th (0-100) latency percentile of a node in seconds,
+        interpolating within its histogram bucket"""
+        counts = self._counts[self.nodes[name]]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q / 100 * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+    
+    def escalation_rate(self) -> float:
+        return self.escalated / self.tickets if self.tickets else 0.0
+    
+    def merge(self, other: "NodeMetrics") -> "NodeMetrics":
+        """Add another instance's counters (with the same buckets) into this one"""
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge metrics with different latency buckets")
+        for name, other_slot in other.nodes.items():
+            slot = self._slot(name)
+            counts = self._counts[slot]
+            for index, count in enumerate(other._counts[other_slot]):
+                counts[index] += count
+            self._seconds[slot] += other._seconds[other_slot]
+        for intent, count in other.intents.items():
+            self.intents[intent] = self.intents.get(intent, 0) + count
+        self.tickets += other.tickets
+        self.escalated += other.escalated
+        return self
+    
+    def take(self) -> "NodeMetrics":
+        """Return a copy of the counters and zero them in place (wrapped nodes keep recording)"""
+        snapshot = NodeMetrics(self.buckets).merge(self)
+        for counts in self._counts:
+            counts[:] = array("q", bytes(8 * len(counts)))
+        for slot in range(len(self._seconds)):
+            self._seconds[slot] = 0.0
+        for intent in self.intents:
+            self.intents[intent] = 0
+        self.tickets = self.escalated = 0
+        return snapshot
+    
+    def summary_lines(self) -> list:
+        """One "node: calls, p50/p95/p99" line per node, for the console summary"""
+        lines = []
+        for name in self.nodes:
+            calls = self.calls(name)
+            if calls:
+                p50, p95, p99 = (self.percentile(name, q) * 1e6 for q in (50, 95, 99))
+                lines.append(f"{name}: {calls} calls, p50 {p50:.1f} µs, p95 {p95:.1f} µs, p99 {p99:.1f} µs")
+        return lines
+    
+    def exposition(self) -> str:
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP support_node_duration_seconds Time spent in each graph node and router.",
+            "# TYPE support_node_duration_seconds histogram",
+        ]
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        for name, slot in self.nodes.items():
+            cumulative = 0
+            for bound, count in zip(bounds, self._counts[slot]):
+                cumulative += count
+                lines.append(f'support_node_duration_seconds_bucket{{node="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'support_node_duration_seconds_sum{{node="{name}"}} {self._seconds[slot]!r}')
+            lines.append(f'support_node_duration_seconds_count{{node="{name}"}} {cumulative}')
+        lines += [
+            "# HELP support_tickets_total Tickets that reached the escalation router.",
+            "# TYPE support_tickets_total counter",
+            f"support_tickets_total {self.tickets}",
+            "# HELP support_tickets_escalated_total Tickets routed to human review.",
+            "# TYPE support_tickets_escalated_total counter",
+            f"support_tickets_escalated_total {self.escalated}",
+            "# HELP support_escalation_ratio Share of tickets routed to human review.",
+            "# TYPE support_escalation_ratio gauge",
+            f"support_escalation_ratio {self.escalation_rate()!r}",
+            "# HELP support_tickets_by_intent_total Tickets routed per classified intent.",
+            "# TYPE support_tickets_by_intent_total counter",
+        ]
+        lines += [f'support_tickets_by_intent_total{{intent="{intent}"}} {count}'
+                  for intent, count in self.intents.items()]
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(metrics: NodeMetrics, port: int, host: str = "127.0.0.1"):
+    """Serve metrics.exposition() at http://host:port/metrics from a daemon thread
+    
+    Call shutdown() on the returned ThreadingHTTPServer to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class MetricsFileWriter:
+    """Rewrite a Prometheus text file every `interval` seconds (e.g. for the
+    node_exporter textfile collector) until closed; the file is replaced
+    atomically so scrapers never see a partial write"""
+    
+    def __init__(self, metrics: NodeMetrics, path: str, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-file", daemon=True)
+        self._thread.start()
+    
+    def write(self):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.write(self.metrics.exposition())
+        os.replace(temporary, self.path)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+    
+    def close(self):
+        """Stop the writer thread and write the final metrics"""
+        self._stop.set()
+        self._thread.join()
+        self.write()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ============= RUN STATISTICS =============
+
+class IncrementalStats:
+    """Run summary aggregated one ticket at a time, so it works without the
+    full results list in memory
+    
+    Counts tickets by intent, priority and customer tier, tracks escalations,
+    and keeps a streaming mean and variance (Welford) plus a fixed-width
+    histogram of sentiment_score for quantiles. Partial aggregates from
+    workers combine with merge(); from_dict() rebuilds one from to_dict().
+    """
+    
+    SCORE_BINS = 1000   # sentiment_score is in [0, 1]; quantiles resolve to 0.001
+    
+    def __init__(self):
+        self.total = 0
+        self.escalated = 0
+        self.intents = Counter()
+        self.priorities = Counter()
+        self.tiers = Counter()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._scores = array("q", bytes(8 * (self.SCORE_BINS + 1)))
+    
+    def add(self, result, tier: str = None):
+        """Count one processed ticket (a TicketState or CompactTicket)
+        
+        The customer's tier is looked up with peek_customer() unless given.
+        """
+        if tier is None:
+            tier = peek_customer(result["customer_id"]).get("tier", "standard")
+        self.total += 1
+        self.escalated += bool(result["escalated"])
+        self.intents[result["intent"]] += 1
+        self.priorities[result["priority"]] += 1
+        self.tiers[tier] += 1
+        
+        score = result["sentiment_score"]
+        delta = score - self._mean
+        self._mean += delta / self.total
+        self._m2 += delta * (score - self._mean)
+        self._scores[round(max(0.0, min(1.0, score)) * self.SCORE_BINS)] += 1
+        return result
+    
+    @classmethod
+    def from_dict(cls, document: dict) -> "IncrementalStats":
+        """Rebuild an aggregate from its to_dict() form, e.g. a summary sidecar"""
+        stats = cls()
+        stats.total = document["total"]
+        stats.escalated = document["escalated"]
+        stats.intents = Counter(document["intents"])
+        stats.priorities = Counter(document["priorities"])
+        stats.tiers = Counter(document["tiers"])
+        score = document["score"]
+        stats._mean = score["mean"]
+        stats._m2 = score["variance"] * max(stats.total - 1, 0)
+        for value, count in score["histogram"].items():
+            stats._scores[round(float(value) * cls.SCORE_BINS)] += count
+        return stats
+    
+    def track(self, results):
+        """Lazily yield results, counting each one as it passes through"""
+        for result in results:
+            yield self.add(result)
+    
+    def merge(self, other: "IncrementalStats") -> "IncrementalStats":
+        """Fold another aggregate into this one (Chan et al.'s parallel variance)"""
+        total = self.total + other.total
+        if other.total:
+            delta = other._mean - self._mean
+            self._m2 += other._m2 + delta * delta * self.total * other.total / total
+            self._mean += delta * other.total / total
+        self.total = total
+        self.escalated += other.escalated
+        self.intents.update(other.intents)
+        self.priorities.update(other.priorities)
+        self.tiers.update(other.tiers)
+        for index, count in enumerate(other._scores):
+            self._scores[index] += count
+        return self
+    
+    @property
+    def auto_resolved(self) -> int:
+        return self.total - self.escalated
+    
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalated / self.total if self.total else 0.0
+    
+    @property
+    def mean_score(self) -> float:
+        return self._mean
+    
+    @property
+    def score_variance(self) -> float:
+        """Sample variance of sentiment_score"""
+        return self._m2 / (self.total - 1) if self.total > 1 else 0.0
+    
+    def score_quantile(self, q: float) -> float:
+        """sentiment_score below which a fraction q (0-1) of tickets fall"""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for index, count in enumerate(self._scores):
+            seen += count
+            if seen >= rank:
+                return index / self.SCORE_BINS
+        return 1.0
+    
+    def summary_lines(self) -> list:
+        """Console summary lines, as printed by main()"""
+        lines = [
+            f"Total tickets processed: {self.total}",
+            f"Escalated to human review: {self.escalated}",
+            f"Auto-resolved: {self.auto_resolved}",
+            "",
+            "Intent Distribution:",
+        ]
+        lines += [f"  • {intent}: {count}" for intent, count in self.intents.items()]
+        lines += [
+            "",
+            f"Priority: {', '.join(f'{priority} {count}' for priority, count in self.priorities.items())}",
+            f"Customer tiers: {', '.join(f'{tier} {count}' for tier, count in self.tiers.items())}",
+            "",
+            f"Average Quality Score: {self.mean_score:.2f}",
+            f"Quality score spread: stdev {math.sqrt(self.score_variance):.3f}, "
+            f"p10 {self.score_quantile(0.1):.2f}, p50 {self.score_quantile(0.5):.2f}, "
+            f"p90 {self.score_quantile(0.9):.2f}",
+        ]
+        return lines
+    
+    def to_dict(self) -> dict:
+        """JSON-ready form of the aggregate, as written to summary sidecars"""
+        return {
+            "total": self.total,
+            "escalated": self.escalated,
+            "auto_resolved": self.auto_resolved,
+            "escalation_rate": self.escalation_rate,
+            "intents": dict(self.intents),
+            "priorities": dict(self.priorities),
+            "tiers": dict(self.tiers),
+            "score": {
+                "mean": self.mean_score,
+                "variance": self.score_variance,
+                "quantiles": {f"p{q}": self.score_quantile(q / 100) for q in (10, 25, 50, 75, 90, 99)},
+                "histogram": {f"{index / self.SCORE_BINS:.3f}": count
+                              for index, count in enumerate(self._scores) if count},
+            },
+        }
+
+
+def summary_sidecar_path(data_path: str) -> str:
+    """Where the pre-aggregated summary of a ticket data file is kept"""
+    return os.path.splitext(data_path)[0] + ".summary.json"
+
+
+def write_summary_sidecar(summary: IncrementalStats, data_path: str) -> str:
+    """Write the summary next to its ticket data file, so the dashboard can
+    chart a large export without aggregating it in the browser
+    
+    The data file's size and mtime are recorded too, so a report can tell
+    whether the sidecar still describes it (see summarize_export).
+    """
+    path = summary_sidecar_path(data_path)
+    data = os.stat(data_path)
+    document = {"data_file": os.path.basename(data_path), "generated": datetime.now().isoformat(),
+                "data_size": data.st_size, "data_mtime_ns": data.st_mtime_ns, **summary.to_dict()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+
+# ============= SLA SCHEDULING =============
+# Pending tickets are served by SLA deadline instead of arrival order. Response
+# targets come from the tech support policy; high priority tightens them.
+
+DURATION_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+PRIORITY_SLA_FACTORS = {"high": 0.25, "normal": 1.0}
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in a policy duration such as "2 hours" or "30 minutes\""""
+    amount, unit = text.split()
+    return float(amount) * DURATION_UNITS[unit.lower().rstrip("s")]
+
+
+def epoch_seconds(value) -> float:
+    """Seconds since the epoch for a number or an ISO 8601 timestamp"""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def sla_targets(policy: dict = None) -> dict:
+    """Response target in seconds per customer tier, from the tech support policy"""
+    policy = policy if policy is not None else policy_retriever.get_policy("tech_support_policy")
+    return {key[:-len("_response")]: parse_duration(value)
+            for key, value in policy.items() if key.endswith("_response")}
+
+
+class ScheduledTicket:
+    """A pending ticket with the SLA fields the scheduler ordered it by"""
+    __slots__ = ("query_data", "tier", "priority", "arrival", "deadline")
+    
+    def __init__(self, query_data: dict, tier: str, priority: str, arrival: float, deadline: float):
+        self.query_data = query_data
+        self.tier = tier
+        self.priority = priority
+        self.arrival = arrival
+        self.deadline = deadline
+
+
+class SLAScheduler:
+    """Heap of pending tickets, most urgent first
+    
+    A ticket's deadline is its arrival time plus its tier's response target
+    (sla_targets), scaled by PRIORITY_SLA_FACTORS for its priority. Tickets
+    are ordered by deadline + aging * arrival: aging=0 is pure earliest-
+    deadline-first, while aging > 0 lets every waiting ticket gain on newer
+    arrivals, so a steady stream of urgent tickets cannot hold back an old
+    normal one indefinitely (large values approach FIFO). A ticket misses
+    its SLA if it is answered after its deadline; pass processed results
+    through match() and, once they are answered (after any human review),
+    through track(), or call complete(), so that is checked. clock supplies
+    arrival and answer times and can be a simulated clock.
+    """
+    
+    def __init__(self, aging: float = 0.0, clock=time.time, targets: dict = None,
+                 priority_factors: dict = None):
+        self.aging = aging
+        self.clock = clock
+        self.targets = targets if targets is not None else sla_targets()
+        self.priority_factors = priority_factors if priority_factors is not None else PRIORITY_SLA_FACTORS
+        self.dispatched = 0
+        self.answered = 0
+        self.missed = 0
+        self._heap = []
+        self._dispatched = deque()
+        self._unanswered = {}
+        self._sequence = itertools.count()
+        self._miss_listeners = []
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+    
+    def on_deadline_miss(self, callback) -> "SLAScheduler":
+        """Call callback(ticket, seconds_late) for each ticket answered after its deadline"""
+        self._miss_listeners.append(callback)
+        return self
+    
+    def submit(self, query_data: dict, arrival: float = None) -> ScheduledTicket:
+        """Queue a ticket, classifying its priority with the graph's own rules
+        
+        arrival defaults to the record's "timestamp" (epoch seconds or ISO
+        8601) when it has one, else to now.
+        """
+        if arrival is None:
+            arrival = epoch_seconds(query_data["timestamp"]) if "timestamp" in query_data else self.clock()
+        priority = classify_intent({"query": query_data["query"], "resolution_notes": []})["priority"]
+        tier = peek_customer(query_data["customer_id"]).get("tier", "standard")
+        target = self.targets.get(tier, self.targets["standard"]) * self.priority_factors.get(priority, 1.0)
+        ticket = ScheduledTicket(query_data, tier, priority, arrival, arrival + target)
+        heapq.heappush(self._heap, (ticket.deadline + self.aging * arrival, next(self._sequence), ticket))
+        return ticket
+    
+    def peek(self) -> ScheduledTicket:
+        return self._heap[0][2]
+    
+    def pop(self) -> ScheduledTicket:
+        """Dispatch the most urgent ticket
+        
+        Raises IndexError when nothing is pending.
+        """
+        ticket = heapq.heappop(self._heap)[2]
+        self.dispatched += 1
+        return ticket
+    
+    def complete(self, ticket: ScheduledTicket, answered: float = None):
+        """Record that a dispatched ticket was answered, reporting it if that was late"""
+        answered = self.clock() if answered is None else answered
+        self.answered += 1
+        if answered > ticket.deadline:
+            self.missed += 1
+            for callback in self._miss_listeners:
+                callback(ticket, answered - ticket.deadline)
+    
+    def drain(self):
+        """Dispatch every pending ticket in order"""
+        while self._heap:
+            yield self.pop()
+    
+    def reorder(self, records, window: int = 1024):
+        """Lazily yield query records in SLA order, holding at most `window` pending
+        
+        Feeds stream_tickets/process_tickets, which keep the order they are given.
+        """
+        for record in records:
+            self.submit(record)
+            if len(self._heap) >= window:
+                yield self._dispatch().query_data
+        while self._heap:
+            yield self._dispatch().query_data
+    
+    def match(self, results):
+        """Lazily pass processed results through, pairing each with its ticket by ticket ID
+        
+        results must come back in the order reorder() yielded the records, as
+        stream_tickets and process_tickets return them.
+        """
+        for result in results:
+            self._unanswered[result["ticket_id"]] = self._dispatched.popleft()
+            yield result
+    
+    def track(self, results):
+        """Lazily pass answered results through, completing their tickets
+        
+        The results must have gone through match() first, but may come in
+        any order, e.g. as a ReviewQueue releases them.
+        """
+        for result in results:
+            self.complete(self._unanswered.pop(result["ticket_id"]))
+            yield result
+    
+    def _dispatch(self) -> ScheduledTicket:
+        ticket = self.pop()
+        self._dispatched.append(ticket)
+        return ticket
+    
+    @property
+    def miss_rate(self) -> float:
+        return self.missed / self.answered if self.answered else 0.0
+
+
+# ============= TICKET IDS =============
+# Snowflake-style IDs: milliseconds since TICKET_EPOCH, host number, process
+# ID and a per-process sequence, written as fixed-width Crockford base32
+# fields. Its alphabet is in ASCII order, so string order is time order and a
+# time range is an ID range.
+TICKET_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+TIME_CHARS, NODE_CHARS, SEQUENCE_CHARS = 9, 7, 3
+HOST_BITS, PROCESS_BITS = 13, 22
+_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_BASE32_VALUES = {char: value for value, char in enumerate(_BASE32)}
+
+
+def _base32(value: int, width: int) -> str:
+    """Crockford base32 for value, zero-padded to width characters"""
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(_BASE32[digit])
+    return "".join(reversed(chars))
+
+
+class TicketIdAllocator:
+    """Unique, time-ordered ticket IDs without a lock on the hot path
+    
+    The (host, process ID, sequence) triple keeps IDs apart: process IDs are
+    unique among a host's running processes, and the sequence would have to
+    wrap within a single millisecond to repeat. Machines writing to the same
+    store need distinct host numbers. Milliseconds come from the monotonic
+    clock, anchored to the wall clock once per process, so a process never
+    issues an ID older than one it issued before; order within a millisecond
+    is not guaranteed. Pickling one carries only its settings.
+    """
+    
+    def __init__(self, host: int = 0, prefix: str = "TKT"):
+        if not 0 <= host < 1 << HOST_BITS:
+            raise ValueError(f"host must be in [0, {1 << HOST_BITS})")
+        self.host = host
+        self.prefix = prefix
+        self.reset()
+    
+    def __getstate__(self):
+        return {"host": self.host, "prefix": self.prefix}
+    
+    def __setstate__(self, state):
+        self.__init__(**state)
+    
+    def reset(self):
+        """Pick up the current process ID and re-anchor the clock (e.g. after a fork)"""
+        process = os.getpid() & ((1 << PROCESS_BITS) - 1)
+        self._node = _base32(self.host << PROCESS_BITS | process, NODE_CHARS)
+        # next() on itertools.count is atomic, so threads never share a value
+        self._sequence = itertools.count()
+        self._anchor = (time.time() - TICKET_EPOCH.timestamp() - time.monotonic()) * 1000
+        # (millisecond, its encoding) in one attribute, so threads always see a matching pair
+        self._clock = (-1, "")
+    
+    def next_id(self) -> str:
+        sequence = next(self._sequence) & 32767
+        millis = int(time.monotonic() * 1000 + self._anchor)
+        clock = self._clock
+        if clock[0] != millis:
+            clock = self._clock = (millis, _base32(millis, TIME_CHARS))
+        return f"{self.prefix}{clock[1]}{self._node}{_BASE32[sequence >> 10]}{_BASE32[sequence >> 5 & 31]}{_BASE32[sequence & 31]}"
+
+
+def ticket_id_time(ticket_id: str, prefix: str = "TKT") -> datetime:
+    """Return the UTC creation time encoded in a ticket ID"""
+    millis = 0
+    for char in ticket_id[len(prefix):len(prefix) + TIME_CHARS]:
+        millis = millis * 32 + _BASE32_VALUES[char]
+    return TICKET_EPOCH + timedelta(milliseconds=millis)
+
+
+def ticket_id_bounds(start: datetime, end: datetime, prefix: str = "TKT") -> tuple:
+    """Return (low, high) so that start <= creation time < end iff low <= ticket_id < high"""
+    def bound(moment: datetime) -> str:
+        if moment.tzinfo is None:
+            moment = moment.astimezone()
+        millis = max(0, math.ceil((moment - TICKET_EPOCH) / timedelta(milliseconds=1)))
+        return prefix + _base32(millis, TIME_CHARS)
+    return bound(start), bound(end)
+
+
+ticket_ids = TicketIdAllocator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: ticket_ids.reset())
+
+
+def use_ticket_ids(allocator: TicketIdAllocator):
+    """Allocate ticket IDs from the given allocator from now on"""
+    global ticket_ids
+    ticket_ids = allocator
+
+
+# ============= MAIN EXECUTION =============
+
+def new_ticket_state(query_data: dict) -> TicketState:
+    """Build the initial graph state for a customer query"""
+    ticket_id = ticket_ids.next_id()
+    
+    return TicketState(
+        ticket_id=ticket_id,
+        customer_id=query_data["customer_id"],
+        query=query_data["query"],
+        intent="",
+        priority="",
+        agent_response="",
+        sentiment_score=0.0,
+        escalated=False,
+        resolution_notes=[],
+        final_response=""
+    )
+
+
+def run_graph(initial_state: TicketState, graph, response_cache=None) -> TicketState:
+    """Run a new ticket through the graph, or answer it from the response cache"""
+    if response_cache is None:
+        return graph.invoke(initial_state)
+    key, records = response_cache_key(initial_state)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return {**initial_state, **cached, "resolution_notes": list(cached["resolution_notes"])}
+    result = graph.invoke(initial_state)
+    cached = {field: result[field] for field in CACHED_FIELDS}
+    cached["resolution_notes"] = tuple(cached["resolution_notes"])
+    response_cache.put(key, cached, records)
+    return result
+
+
+def process_ticket(query_data: dict, graph, verbose: bool = True, response_cache: ResponseCache = None,
+                   dedup: NearDuplicateIndex = None):
+    """Process a single support ticket
+    
+    With a response_cache, a ticket whose features match an earlier one
+    reuses that result instead of running the graph. With a dedup index, a
+    near-duplicate of a recent ticket reuses that ticket's result (see
+    coalesce_ticket).
+    """
+    
+    initial_state = new_ticket_state(query_data)
+    
+    if verbose:
+        print(f"\n{'='*80}")
+        print(f"TICKET ID: {initial_state['ticket_id']}")
+        print(f"CUSTOMER: {query_data['customer_id']}")
+        print(f"{'='*80}")
+        print(f"\nCUSTOMER QUERY:")
+        print(f"{query_data['query']}")
+        print(f"\n{'-'*80}")
+    
+    # Run through the graph
+    cluster = None
+    if dedup is not None:
+        # Classifying is a memoized keyword scan; a near-duplicate only joins
+        # a cluster that classified the same way
+        classified = classify_intent({**initial_state, "resolution_notes": []})
+        cluster, similarity = dedup.assign(classified)
+    result = None
+    if cluster is not None and cluster.representative != initial_state["ticket_id"]:
+        result = coalesce_ticket(classified, cluster, similarity)
+        if result is not None:
+            dedup.count_reused()
+    if result is None:
+        result = run_graph(initial_state, graph, response_cache)
+        if cluster is not None and cluster.representative == initial_state["ticket_id"]:
+            cluster.result = result
+    
+    if verbose:
+        print(f"\nRESOLUTION FLOW:")
+        for note in result["resolution_notes"]:
+            print(f"  • {note}")
+        
+        print(f"\n{'-'*80}")
+        print(f"FINAL RESPONSE:")
+        print(f"{result['final_response']}")
+        print(f"{'='*80}\n")
+    
+    return result
+
+
+# ============= HUMAN REVIEW QUEUE =============
+
+class ReviewQueue:
+    """Escalated tickets waiting for a bounded pool of simulated human reviewers
+    
+    Reviews run on a background event loop, so the pipeline keeps processing
+    auto-approved tickets. hand_off() (or `await submit()` from async code)
+    only blocks once max_pending tickets are waiting, which is the pipeline's
+    backpressure. Each review takes review_time(rng) simulated seconds (see
+    lognormal_service), slept as that many seconds times time_scale. A
+    reviewed ticket is updated in place with the agent's response as its
+    final response and passed to on_reviewed, if given, on the review thread.
+    """
+    
+    def __init__(self, reviewers: int = 2, review_time=None, max_pending: int = 100, time_scale: float = 0.001,
+                 seed: int = 0, on_reviewed=None):
+        self.reviewers = reviewers
+        self.review_time = review_time if review_time is not None else lognormal_service(1200)
+        self.max_pending = max_pending
+        self.time_scale = time_scale
+        self.on_reviewed = on_reviewed
+        self.submitted = 0
+        self.reviewed = 0
+        self.blocked = 0             # hand-offs that had to wait for room in the queue
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self.latency_total = 0.0     # simulated seconds from hand-off to approval
+        self.latency_max = 0.0
+        self._rng = random.Random(seed)
+        self._waiting = deque()      # hand-off times of waiting tickets (queued or blocked), oldest first
+        self._outbox = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="review-queue", daemon=True)
+        self._thread.start()
+        self._call(self._start())
+    
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+    
+    async def _start(self):
+        self._queue = asyncio.Queue(self.max_pending)
+        self._workers = [asyncio.create_task(self._review()) for _ in range(self.reviewers)]
+    
+    async def _stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+    
+    async def _enqueue(self, result: TicketState):
+        # A hand-off blocked by a full queue is already waiting for review
+        handed_off = time.monotonic()
+        if self._queue.full():
+            self.blocked += 1
+        self._waiting.append(handed_off)
+        await self._queue.put((handed_off, result))
+        self.blocked_seconds += time.monotonic() - handed_off
+        self.submitted += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+    
+    async def _review(self):
+        while True:
+            handed_off, result = await self._queue.get()
+            self._waiting.popleft()
+            await asyncio.sleep(self.review_time(self._rng) * self.time_scale)
+            result["final_response"] = result["agent_response"]
+            result["resolution_notes"].append("👤 Human review approved the response and sent it to the customer")
+            latency = (time.monotonic() - handed_off) / self.time_scale
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.reviewed += 1
+            if self.on_reviewed is not None:
+                self.on_reviewed(result)
+            if self._outbox is not None:
+                self._outbox.put(result)
+            self._queue.task_done()
+    
+    def hand_off(self, result: TicketState):
+        """Queue an escalated ticket for review, blocking while the queue is full"""
+        self._call(self._enqueue(result))
+    
+    async def submit(self, result: TicketState):
+        """Async hand_off: waits for room in the queue without blocking the caller's loop"""
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._enqueue(result), self._loop))
+    
+    def join(self):
+        """Wait until every ticket handed off so far has been reviewed"""
+        self._call(self._queue.join())
+    
+    def route(self, results):
+        """Lazily yield auto-approved results as they come and escalated ones
+        once reviewed, handing the latter off along the way"""
+        self._outbox = outbox = queue.Queue()
+        pending = 0
+        for result in results:
+            if result["escalated"]:
+                self.hand_off(result)
+                pending += 1
+            else:
+                yield result
+            while not outbox.empty():
+                pending -= 1
+                yield outbox.get()
+        for _ in range(pending):
+            yield outbox.get()
+    
+    def backpressure(self) -> dict:
+        """Current queue depth and the age (simulated seconds) of the oldest waiting ticket"""
+        try:
+            oldest_age = (time.monotonic() - self._waiting[0]) / self.time_scale
+        except IndexError:
+            oldest_age = 0.0
+        return {"depth": self._queue.qsize(), "oldest_age_s": oldest_age, "max_depth": self.max_depth,
+                "blocked_hand_offs": self.blocked, "blocked_seconds": self.blocked_seconds}
+    
+    def stats(self) -> dict:
+        return {**self.backpressure(), "submitted": self.submitted, "reviewed": self.reviewed,
+                "mean_latency_s": self.latency_total / self.reviewed if self.reviewed else 0.0,
+                "max_latency_s": self.latency_max}
+    
+    def close(self):
+        """Finish the queued reviews and stop the review loop"""
+        self.join()
+        self._call(self._stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# ============= PARALLEL PROCESSING =============
+# Each pool worker sets up in the pool initializer: it uses its process's
+# shared compiled graph (or compiles its own when node metrics are enabled,
+# since those are per worker) and keeps its own response cache and
+# near-duplicate index when those are enabled
+_worker = threading.local()
+
+
+def _init_worker(database=None, cache_options: dict = None, engine: str = "langgraph",
+                 metrics: NodeMetrics = None, dedup_options: dict = None, allocator: TicketIdAllocator = None):
+    if database is not None:
+        use_database(database)
+    if allocator is not None:
+        use_ticket_ids(allocator)
+    _worker.metrics = NodeMetrics(metrics.buckets) if metrics is not None else None
+    _worker.graph = create_support_graph(engine, _worker.metrics)
+    _worker.cache = ResponseCache(**cache_options).watch(db) if cache_options else None
+    _worker.dedup = NearDuplicateIndex(**dedup_options) if dedup_options else None
+
+
+def process_batch(queries: list, graph, stats: Counter = None, response_cache=None,
+                  summary: IncrementalStats = None, dedup: NearDuplicateIndex = None) -> list:
+    """Prefetch a batch's customers and orders in bulk, then run each ticket through the graph
+    
+    If a Counter is passed as stats, the batch's lookup, response cache,
+    near-duplicate and template rendering counters are added to it; each
+    result is also added to summary if given.
+    """
+    cache_before = response_cache.counters() if response_cache is not None else None
+    dedup_before = dedup.counters() if dedup is not None else None
+    with prefetch(queries) as lookups:
+        results = [process_ticket(query_data, graph, verbose=False, response_cache=response_cache, dedup=dedup)
+                   for query_data in queries]
+        if summary is not None:
+            for result in results:
+                summary.add(result)
+    if stats is not None:
+        stats.update(lookup_hits=lookups.hits, lookup_misses=lookups.misses)
+        if response_cache is not None:
+            stats.update(response_cache.counters() - cache_before)
+        if dedup is not None:
+            stats.update(dedup.counters() - dedup_before)
+        stats.update(template_engine.take())
+    return results
+
+
+def _process_chunk_in_worker(chunk: list, summarize: bool = False) -> tuple:
+    stats = Counter()
+    summary = IncrementalStats() if summarize else None
+    results = process_batch(chunk, _worker.graph, stats, _worker.cache, summary, _worker.dedup)
+    # Hand back only this chunk's node timings; the caller merges them
+    return results, stats, _worker.metrics.take() if _worker.metrics is not None else None, summary
+
+
+async def _process_tickets_async(queries: list, workers: int, stats: Counter = None,
+                                 engine: str = "langgraph", metrics: NodeMetrics = None,
+                                 summary: IncrementalStats = None, reviews: ReviewQueue = None) -> list:
+    graph = create_support_graph(engine, metrics)
+    slots = asyncio.Semaphore(workers)
+    
+    async def run(query_data: dict):
+        async with slots:
+            result = await graph.ainvoke(new_ticket_state(query_data))
+            if reviews is not None and result["escalated"]:
+                await reviews.submit(result)
+            return result
+    
+    # Tasks copy the current context, so they all read from this batch's cache
+    with prefetch(queries) as lookups:
+        results = await asyncio.gather(*(run(query_data) for query_data in queries))
+        if summary is not None:
+            for result in results:
+                summary.add(result)
+    if stats is not None:
+        stats.update(lookup_hits=lookups.hits, lookup_misses=lookups.misses)
+        stats.update(template_engine.take())
+    return results
+
+
+def process_tickets(queries: list, workers: int = 1, executor: str = "process", batch_size: int = 256,
+                    stats: Counter = None, cache_options: dict = None, engine: str = "langgraph",
+                    compact: bool = False, metrics: NodeMetrics = None,
+                    summary: IncrementalStats = None, reviews: ReviewQueue = None,
+                    dedup_options: dict = None) -> list:
+    """Process many tickets concurrently, returning results in input order.
+    
+    executor is "process" (one graph per worker process), "thread" (worker
+    threads sharing one graph, or one each with metrics) or "async" (one
+    graph driven through ainvoke with up to `workers` tickets in flight).
+    Tickets are handed out in batches of `batch_size`, each with its
+    customer and order lookups prefetched.
+    cache_options (ResponseCache keyword arguments) give every process/thread
+    worker its own response cache. Pass a Counter as stats to collect the
+    lookup and response cache counters. engine picks the graph runtime (see
+    create_support_graph). compact=True returns CompactTicket records, which
+    take far less memory when many results are held at once. Pass a
+    NodeMetrics as metrics to collect per-node timings from every worker, and
+    an IncrementalStats as summary to have each worker aggregate the results
+    it produces. With a ReviewQueue as reviews, escalated tickets are handed
+    off as they come out of the graph and returned once reviewed.
+    dedup_options (NearDuplicateIndex keyword arguments) give every
+    process/thread worker its own near-duplicate index, so clusters form
+    within a worker.
+    """
+    if executor == "async":
+        results = asyncio.run(_process_tickets_async(queries, workers, stats, engine, metrics, summary, reviews))
+        if reviews is not None:
+            reviews.join()
+        return [CompactTicket.from_dict(result) for result in results] if compact else results
+    if executor not in ("process", "thread"):
+        raise ValueError(f"Unknown executor: {executor}")
+    
+    # Tickets under review are still updated in place, so convert them only afterwards
+    convert = CompactTicket.from_dict if compact and reviews is None else None
+    batches = [queries[start:start + batch_size] for start in range(0, len(queries), batch_size)]
+    results = []
+    
+    def collect(batch_results: list):
+        if reviews is not None:
+            for result in batch_results:
+                if result["escalated"]:
+                    reviews.hand_off(result)
+        results.extend(map(convert, batch_results) if convert else batch_results)
+    
+    if workers <= 1:
+        graph = create_support_graph(engine, metrics)
+        response_cache = ResponseCache(**cache_options).watch(db) if cache_options else None
+        dedup = NearDuplicateIndex(**dedup_options) if dedup_options else None
+        for batch in batches:
+            collect(process_batch(batch, graph, stats, response_cache, summary, dedup))
+    else:
+        pool_class = concurrent.futures.ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        with pool_class(max_workers=workers, initializer=_init_worker,
+                        initargs=(db, cache_options, engine, metrics, dedup_options, ticket_ids)) as pool:
+            work = functools.partial(_process_chunk_in_worker, summarize=summary is not None)
+            for batch_results, batch_stats, batch_metrics, batch_summary in pool.map(work, batches):
+                collect(batch_results)
+                if stats is not None:
+                    stats.update(batch_stats)
+                if metrics is not None:
+                    metrics.merge(batch_metrics)
+                if summary is not None:
+                    summary.merge(batch_summary)
+    
+    if reviews is not None:
+        reviews.join()
+        if compact:
+            results = [CompactTicket.from_dict(result) for result in results]
+    return results
+
+
+# ============= STREAMING INGESTION =============
+# parse -> graph.invoke -> sink, one record at a time, so memory stays flat
+# no matter how large the input is
+
+def read_queries_jsonl(source: str):
+    """Lazily yield {"customer_id", "query"} records from a JSONL file ("-" for stdin)"""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                query_data = {"customer_id": record["customer_id"], "query": record["query"]}
+                if "timestamp" in record:
+                    query_data["timestamp"] = record["timestamp"]
+                yield query_data
+            except (ValueError, KeyError, TypeError) as e:
+                raise ValueError(f"{source}:{line_number}: invalid ticket record ({e})") from e
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def stream_tickets(records, workers: int = 1, executor: str = "thread", window: int = 64,
+                   stats: Counter = None, cache_options: dict = None, engine: str = "langgraph",
+                   metrics: NodeMetrics = None, summary: IncrementalStats = None, dedup_options: dict = None):
+    """Lazily yield processed tickets in input order.
+    
+    At most `window` tickets are in flight at once; the input is only read
+    further once the consumer has taken the oldest result, which gives the
+    pipeline backpressure. Tickets move through the graph in small batches
+    whose customer and order lookups are prefetched in bulk; see
+    process_tickets for stats, cache_options, engine, metrics, summary and
+    dedup_options.
+    """
+    if executor not in ("process", "thread"):
+        raise ValueError(f"Streaming supports the process and thread executors, not {executor}")
+    
+    # Batches amortize lookups (and IPC for worker processes), while the
+    # number of tickets in flight still stays within the window
+    chunk_size = max(1, window // (max(workers, 1) * 2))
+    max_chunks = max(1, window // chunk_size)
+    records = iter(records)
+    
+    if workers <= 1:
+        graph = create_support_graph(engine, metrics)
+        response_cache = ResponseCache(**cache_options).watch(db) if cache_options else None
+        dedup = NearDuplicateIndex(**dedup_options) if dedup_options else None
+        while chunk := list(itertools.islice(records, chunk_size)):
+            yield from process_batch(chunk, graph, stats, response_cache, summary, dedup)
+        return
+    
+    pool_class = concurrent.futures.ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=workers, initializer=_init_worker,
+                    initargs=(db, cache_options, engine, metrics, dedup_options, ticket_ids)) as pool:
+        in_flight = deque()
+        summarize = summary is not None
+        while chunk := list(itertools.islice(records, chunk_size)):
+            if len(in_flight) >= max_chunks:
+                yield from _collect(in_flight.popleft(), stats, metrics, summary)
+            in_flight.append(pool.submit(_process_chunk_in_worker, chunk, summarize))
+        while in_flight:
+            yield from _collect(in_flight.popleft(), stats, metrics, summary)
+
+
+def _collect(future, stats: Counter = None, metrics: NodeMetrics = None, summary: IncrementalStats = None) -> list:
+    results, batch_stats, batch_metrics, batch_summary = future.result()
+    if stats is not None:
+        stats.update(batch_stats)
+    if metrics is not None:
+        metrics.merge(batch_metrics)
+    if summary is not None:
+        summary.merge(batch_summary)
+    return results
+
+
+def write_results_jsonl(results, sink) -> int:
+    """Write each processed ticket to the sink as one JSON line, returning the count"""
+    count = 0
+    for result in results:
+        sink.write(json.dumps(ticket_record(result), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def ticket_record(result: TicketState) -> dict:
+    """Flatten a processed ticket into the JSON record used by the data files"""
+    customer = db.get_customer(result["customer_id"])
+    return {
+        "ticket_id": result["ticket_id"],
+        "customer_id": result["customer_id"],
+        "customer_name": customer.get('name', 'Unknown'),
+        "customer_tier": customer.get("tier", "standard"),
+        "query": result["query"],
+        "intent": result["intent"],
+        "priority": result["priority"],
+        "sentiment_score": result["sentiment_score"],
+        "escalated": result["escalated"],
+        "resolution_notes": result["resolution_notes"],
+        "final_response": result["final_response"],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def render_ticket_report(record: dict) -> str:
+    """Render the detailed text report for one ticket record (see ticket_record)"""
+    date = datetime.fromisoformat(record["timestamp"]).strftime("%Y-%m-%d %H:%M:%S")
+    ticket_report = f"""CUSTOMER SUPPORT TICKET REPORT
+{'='*80}
+Ticket ID: {record['ticket_id']}
+Customer ID: {record['customer_id']}
+Customer Name: {record['customer_name']}
+Date: {date}
+{'='*80}
+
+CUSTOMER QUERY:
+{record['query']}
+
+{'='*80}
+TICKET CLASSIFICATION:
+Intent: {record['intent']}
+Priority: {record['priority']}
+Sentiment Score: {record['sentiment_score']:.2f}
+Escalated: {'Yes' if record['escalated'] else 'No'}
+
+{'='*80}
+RESOLUTION FLOW:
+"""
+    for note in record['resolution_notes']:
+        ticket_report += f"  • {note}\n"
+    
+    ticket_report += f"""
+{'='*80}
+FINAL RESPONSE:
+{record['final_response']}
+
+{'='*80}
+"""
+    return ticket_report
+
+
+def save_results_to_file(results, output_folder: str = "ticket_results", ticket_reports: bool = True,
+                         summary: IncrementalStats = None, store: "ResultStore" = None):
+    """Save ticket results to organized files in a folder
+    
+    Set ticket_reports=False when the tickets already went to an ArchiveWriter
+    to skip writing one text file per ticket. results can be any iterable; it
+    is read once. Pass the run's IncrementalStats as summary if the tickets
+    were already counted, otherwise they are counted here. With a
+    ResultStore, the records are also written to it.
+    """
+    
+    # Create output folder if it doesn't exist
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    
+    # Create timestamp for this run
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    counted = summary is not None
+    if not counted:
+        summary = IncrementalStats()
+    details = []
+    json_data = []
+    for result in results:
+        record = ticket_record(result)
+        json_data.append(record)
+        if not counted:
+            summary.add(result)
+        
+        # Save individual ticket files
+        if ticket_reports:
+            ticket_filename = os.path.join(output_folder, f"{result['ticket_id']}_{timestamp}.txt")
+            with open(ticket_filename, 'w', encoding='utf-8') as f:
+                f.write(render_ticket_report(record))
+        
+        details.append(f"""
+Ticket: {record['ticket_id']}
+Customer: {record['customer_name']} ({record['customer_id']})
+Intent: {record['intent']} | Priority: {record['priority']} | Escalated: {'Yes' if record['escalated'] else 'No'}
+Query: {record['query'][:100]}{'...' if len(record['query']) > 100 else ''}
+---
+""")
+    
+    # Save summary report
+    summary_report = [f"""CUSTOMER SUPPORT SUMMARY REPORT
+{'='*80}
+Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+{'='*80}
+
+STATISTICS:
+Total tickets processed: {summary.total}
+Escalated to human review: {summary.escalated}
+Auto-resolved: {summary.auto_resolved}
+
+INTENT DISTRIBUTION:
+"""]
+    summary_report += [f"  • {intent}: {count}\n" for intent, count in summary.intents.items()]
+    summary_report.append(f"\nAVERAGE QUALITY SCORE: {summary.mean_score:.2f}\n\n")
+    summary_report.append(f"{'='*80}\nTICKET DETAILS:\n{'='*80}\n\n")
+    summary_report += details
+    
+    summary_filename = os.path.join(output_folder, f"SUMMARY_{timestamp}.txt")
+    with open(summary_filename, 'w', encoding='utf-8') as f:
+        f.write("".join(summary_report))
+    
+    # Save JSON version for data analysis
+    json_filename = os.path.join(output_folder, f"tickets_data_{timestamp}.json")
+    with open(json_filename, 'w', encoding='utf-8') as f:
+        json.dump(json_data, f, indent=2, ensure_ascii=False)
+    write_summary_sidecar(summary, json_filename)
+    if store is not None:
+        store.add(json_data)
+    
+    return output_folder, timestamp
+
+
+# ============= RESULT ARCHIVE =============
+# Tickets are appended as NDJSON records to a few rotated segment files by a
+# background writer thread, instead of one small text file per ticket.
+# An index maps each ticket_id to its record so the text report can still be
+# rendered on demand.
+
+ARCHIVE_INDEX = "index.tsv"
+FSYNC_POLICIES = ("never", "interval", "batch")
+
+
+def _segment_name(number: int) -> str:
+    return f"segment_{number:06d}.ndjson"
+
+
+class ArchiveWriter:
+    """Append-only ticket archive fed through a queue to a dedicated writer thread.
+    
+    fsync policy: "never" leaves durability to the OS, "interval" fsyncs on
+    every periodic flush, "batch" fsyncs after every batch written. If the
+    writer thread fails (disk full, a record JSON can't encode), the next
+    submit() or close() re-raises its exception.
+    """
+    
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, flush_interval: float = 1.0,
+                 fsync: str = "interval", queue_size: int = 10000):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.written = 0
+        self._error = None
+        
+        os.makedirs(directory, exist_ok=True)
+        existing = sorted(name for name in os.listdir(directory) if name.startswith("segment_"))
+        self._segment_number = int(existing[-1][8:14]) if existing else 1
+        self._segment = open(os.path.join(directory, _segment_name(self._segment_number)), "ab")
+        self._index = open(os.path.join(directory, ARCHIVE_INDEX), "a", encoding="utf-8")
+        
+        # A bounded queue only blocks submitters if the writer falls far behind
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, result: TicketState):
+        """Queue a processed ticket for archiving without waiting on disk I/O"""
+        self._put(ticket_record(result))
+    
+    def close(self):
+        """Write everything still queued, then stop the writer thread"""
+        if self._thread.is_alive():
+            with contextlib.suppress(BaseException):
+                self._put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+    
+    def _put(self, item):
+        # Wait for queue space only while the writer is alive to free it
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                return self._queue.put(item, timeout=0.1)
+            except queue.Full:
+                pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _run(self):
+        try:
+            self._write_until_closed()
+        except BaseException as e:
+            self._error = e
+        finally:
+            for stream in (self._segment, self._index):
+                with contextlib.suppress(OSError):
+                    stream.close()
+    
+    def _write_until_closed(self):
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            # Drain whatever else is already waiting into the same batch
+            while batch and len(batch) < 1024:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+            
+            if batch:
+                self._write_batch(batch)
+                if self.fsync == "batch":
+                    self._flush(sync=True)
+            if not running or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush(sync=self.fsync != "never")
+                last_flush = time.monotonic()
+    
+    def _write_batch(self, batch: list):
+        for record in batch:
+            if self._segment.tell() >= self.segment_bytes:
+                self._rotate()
+            line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+            offset = self._segment.tell()
+            self._segment.write(line)
+            self._index.write(f"{record['ticket_id']}\t{self._segment_number}\t{offset}\t{len(line)}\n")
+            self.written += 1
+    
+    def _rotate(self):
+        self._flush(sync=self.fsync != "never")
+        self._segment.close()
+        self._segment_number += 1
+        self._segment = open(os.path.join(self.directory, _segment_name(self._segment_number)), "ab")
+    
+    def _flush(self, sync: bool):
+        self._segment.flush()
+        self._index.flush()
+        if sync:
+            os.fsync(self._segment.fileno())
+            os.fsync(self._index.fileno())
+
+
+class ArchiveReader:
+    """Read tickets back out of an archive written by ArchiveWriter"""
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._locations = {}
+        self._sorted_ids = None
+        with open(os.path.join(directory, ARCHIVE_INDEX), encoding="utf-8") as f:
+            for line in f:
+                ticket_id, segment, offset, length = line.rstrip("\n").split("\t")
+                self._locations[ticket_id] = (int(segment), int(offset), int(length))
+    
+    def __len__(self) -> int:
+        return len(self._locations)
+    
+    def __contains__(self, ticket_id: str) -> bool:
+        return ticket_id in self._locations
+    
+    def get(self, ticket_id: str) -> dict:
+        """Return the archived record for a ticket"""
+        if ticket_id not in self._locations:
+            raise KeyError(f"Ticket {ticket_id} is not in the archive at {self.directory}")
+        segment, offset, length = self._locations[ticket_id]
+        with open(os.path.join(self.directory, _segment_name(segment)), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+    
+    def report(self, ticket_id: str) -> str:
+        """Render the classic per-ticket text report on demand"""
+        return render_ticket_report(self.get(ticket_id))
+    
+    def between(self, start: datetime, end: datetime) -> list:
+        """IDs of the archived tickets created in [start, end), oldest first"""
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self._locations)
+        low, high = ticket_id_bounds(start, end)
+        ids = self._sorted_ids
+        return ids[bisect.bisect_left(ids, low):bisect.bisect_left(ids, high)]
+
+
+# ============= RESULT STORE =============
+# Processed tickets in one SQLite table, indexed for the operational
+# questions asked of them ("escalated billing tickets from premium customers
+# this week"). Every index ends in (timestamp, ticket_id), so a filtered page
+# comes straight off one index in newest-first order.
+STORE_FILTERS = ("intent", "priority", "escalated", "customer_id", "tier")
+
+
+class ResultStore:
+    """Queryable SQLite store of processed ticket records (see ticket_record)
+    
+    Runs in WAL mode so queries can run while a run is writing. Each thread
+    (and each forked process) gets its own connection.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tickets (
+            ticket_id TEXT PRIMARY KEY,
+            customer_id TEXT NOT NULL,
+            tier TEXT NOT NULL,
+            intent TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            escalated INTEGER NOT NULL,
+            sentiment_score REAL NOT NULL,
+            timestamp TEXT NOT NULL,
+            record TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_tickets_timestamp ON tickets (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_intent ON tickets (intent, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets (priority, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_escalated ON tickets (escalated, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_customer ON tickets (customer_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_tickets_tier ON tickets (tier, timestamp);
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._unanalyzed = 0
+        self._connection().executescript(self.SCHEMA)
+    
+    def __getstate__(self):
+        return {"path": self.path}
+    
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+    
+    def _connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            # Sampled statistics are enough for the planner to pick the most selective index
+            connection.execute("PRAGMA analysis_limit=1000")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+    
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+    
+    def add(self, records, batch_size: int = 10000) -> int:
+        """Insert (or replace) ticket records, returning how many were written
+        
+        The tier is the record's customer_tier, taken when the ticket was
+        processed. Records from before that field existed get the customer's
+        current tier from the database instead.
+        """
+        connection = self._connection()
+        records = iter(records)
+        count = 0
+        with connection:
+            while batch := list(itertools.islice(records, batch_size)):
+                untiered = {record["customer_id"] for record in batch if "customer_tier" not in record}
+                customers = db.get_customers(untiered) if untiered else {}
+                connection.executemany(
+                    "INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(record["ticket_id"], record["customer_id"],
+                      record.get("customer_tier") or customers[record["customer_id"]].get("tier", "standard"),
+                      record["intent"],
+                      record["priority"], int(record["escalated"]), record["sentiment_score"],
+                      record["timestamp"], json.dumps(record, ensure_ascii=False)) for record in batch])
+                count += len(batch)
+        # Refresh the planner statistics once enough new rows have come in
+        self._unanalyzed += count
+        if self._unanalyzed >= 1000:
+            connection.execute("ANALYZE tickets")
+            self._unanalyzed = 0
+        return count
+    
+    def tee(self, results, batch_size: int = 1000):
+        """Yield processed tickets unchanged while writing them to the store in batches"""
+        batch = []
+        for result in results:
+            batch.append(ticket_record(result))
+            if len(batch) >= batch_size:
+                self.add(batch)
+                batch = []
+            yield result
+        self.add(batch)
+    
+    def import_file(self, path: str) -> int:
+        """Load a tickets_data_*.json file or a JSONL results file"""
+        with open(path, encoding="utf-8") as f:
+            if path.endswith(".json"):
+                return self.add(json.load(f))
+            return self.add(json.loads(line) for line in f if line.strip())
+    
+    def get(self, ticket_id: str) -> dict:
+        """Return the stored record for a ticket"""
+        row = self._connection().execute("SELECT record FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Ticket {ticket_id} is not in the store at {self.path}")
+        return json.loads(row[0])
+    
+    def query(self, limit: int = 50, cursor: str = None, since=None, until=None, **filters) -> dict:
+        """Return one page of matching records, newest first
+        
+        filters match STORE_FILTERS columns exactly; since/until bound the
+        timestamp (datetime or ISO string, until exclusive). The page is
+        {"tickets": [...], "next": cursor}; pass "next" back as cursor for
+        the following page, it is None on the last one.
+        """
+        where, params = self._where(since, until, filters)
+        if cursor:
+            timestamp, _, ticket_id = cursor.partition("|")
+            where.append("(timestamp, ticket_id) < (?, ?)")
+            params += [timestamp, ticket_id]
+        rows = self._connection().execute(
+            f"SELECT timestamp, ticket_id, record FROM tickets {self._clause(where)} "
+            f"ORDER BY timestamp DESC, ticket_id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        page = rows[:limit]
+        return {"tickets": [json.loads(record) for _, _, record in page],
+                "next": f"{page[-1][0]}|{page[-1][1]}" if len(rows) > limit else None}
+    
+    def count(self, since=None, until=None, **filters) -> int:
+        """Number of records matching the same filters as query"""
+        where, params = self._where(since, until, filters)
+        return self._connection().execute(f"SELECT COUNT(*) FROM tickets {self._clause(where)}", params).fetchone()[0]
+    
+    @staticmethod
+    def _where(since, until, filters: dict) -> tuple:
+        where, params = [], []
+        for column, value in filters.items():
+            if column not in STORE_FILTERS:
+                raise ValueError(f"Unknown filter {column!r}; expected one of {', '.join(STORE_FILTERS)}")
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(int(value) if column == "escalated" else value)
+        for operator, moment in ((">=", since), ("<", until)):
+            if moment is not None:
+                if isinstance(moment, datetime):
+                    # Records carry local, naive timestamps
+                    moment = (moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment).isoformat()
+                where.append(f"timestamp {operator} ?")
+                params.append(moment)
+        return where, params
+    
+    @staticmethod
+    def _clause(where: list) -> str:
+        return f"WHERE {' AND '.join(where)}" if where else ""
+
+
+# ============= HISTORIC REPORTS =============
+# Month-end reports over many tickets_data_*.json exports. Each file is parsed
+# as a stream from a memory map, one worker process per file, and its summary
+# is cached in the file's .summary.json sidecar, so later reports only parse
+# files that are new or have changed since.
+EXPORT_PATTERN = "tickets_data_*.json"
+REPORT_PERIODS = ("run", "day", "week", "month")
+_EXPORT_TIME = re.compile(r"(\d{8}_\d{6})")
+_JSON_SEPARATORS = re.compile(r"[\s,\[\]\ufeff]*")
+
+
+def iter_json_records(path: str, chunk_size: int = 1 << 20):
+    """Lazily yield the objects of a JSON array or JSONL file
+    
+    The file is memory-mapped and decoded chunk_size bytes at a time; an
+    object cut off by the end of a chunk is parsed again once the next
+    chunk is in, so memory stays at about one chunk whatever the file size.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = codecs.getincrementaldecoder("utf-8")()
+            buffer, position, offset, size = "", 0, 0, len(data)
+            while True:
+                position = _JSON_SEPARATORS.match(buffer, position).end()
+                try:
+                    if position == len(buffer):
+                        raise ValueError("end of buffer")
+                    record, position = decoder.raw_decode(buffer, position)
+                except ValueError:
+                    if offset >= size:
+                        if position == len(buffer):
+                            return
+                        raise
+                    buffer = buffer[position:] + text.decode(data[offset:offset + chunk_size],
+                                                             final=offset + chunk_size >= size)
+                    position, offset = 0, offset + chunk_size
+                    continue
+                yield record
+
+
+def export_time(path: str) -> datetime:
+    """When an export was written: the timestamp in its name, else its mtime"""
+    match = _EXPORT_TIME.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def summarize_export(path: str, rescan: bool = False) -> tuple:
+    """Return (summary document, parsed) for one export
+    
+    The file's sidecar is used as is while it still matches the file's size
+    and mtime; otherwise the file is parsed and the sidecar rewritten.
+    """
+    if not rescan:
+        try:
+            with open(summary_sidecar_path(path), encoding="utf-8") as f:
+                document = json.load(f)
+            data = os.stat(path)
+            if (document.get("data_size"), document.get("data_mtime_ns")) == (data.st_size, data.st_mtime_ns) \
+                    and "histogram" in document["score"]:
+                return document, False
+        except (OSError, ValueError, KeyError):
+            pass
+    summary = IncrementalStats()
+    for record in iter_json_records(path):
+        summary.add(record, tier=record.get("customer_tier"))
+    with open(write_summary_sidecar(summary, path), encoding="utf-8") as f:
+        return json.load(f), True
+
+
+def report_period(moment: datetime, period: str) -> str:
+    if period == "run":
+        return moment.strftime("%Y-%m-%d %H:%M:%S")
+    if period == "day":
+        return moment.strftime("%Y-%m-%d")
+    if period == "week":
+        year, week, _ = moment.isocalendar()
+        return f"{year}-W{week:02d}"
+    return moment.strftime("%Y-%m")
+
+
+def historic_report(paths: list, workers: int = 1, period: str = "day", rescan: bool = False) -> dict:
+    """Aggregate many exports into an overall summary and a per-period trend
+    
+    Files are summarized in parallel by `workers` processes (see
+    summarize_export). The report holds the overall summary, one summary per
+    period ("run", "day", "week" or "month", oldest first) and how many files
+    had to be parsed.
+    """
+    if period not in REPORT_PERIODS:
+        raise ValueError(f"Unknown report period: {period}")
+    summarize = functools.partial(summarize_export, rescan=rescan)
+    if workers <= 1 or len(paths) <= 1:
+        documents = list(map(summarize, paths))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            documents = list(pool.map(summarize, paths, chunksize=max(1, len(paths) // (workers * 4))))
+    
+    overall = IncrementalStats()
+    periods = defaultdict(IncrementalStats)
+    for path, (document, _) in zip(paths, documents):
+        stats = IncrementalStats.from_dict(document)
+        overall.merge(stats)
+        periods[report_period(export_time(path), period)].merge(stats)
+    return {
+        "files": len(paths),
+        "parsed": sum(parsed for _, parsed in documents),
+        "period": period,
+        "overall": overall.to_dict(),
+        "trend": [{"period": key, **periods[key].to_dict()} for key in sorted(periods)],
+    }
+
+
+def find_exports(locations: list) -> list:
+    """Export files named by the given paths, globs or directories, oldest first"""
+    paths = set()
+    for location in locations:
+        if os.path.isdir(location):
+            location = os.path.join(location, EXPORT_PATTERN)
+        paths.update(glob.glob(location) if any(char in location for char in "*?[") else [location])
+    return sorted((path for path in paths if os.path.isfile(path) and not path.endswith(".summary.json")),
+                  key=export_time)
+
+
+# ============= TICKET SERVICE =============
+# A long-lived HTTP/1.1 service on asyncio streams (TCP or a Unix socket).
+# The graph is compiled once (once per worker thread with metrics) and the
+# data stays loaded, so a request only pays for its own tickets. Requests on a connection may be
+# pipelined: they run concurrently and their responses go out in order.
+SERVICE_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ServiceError(Exception):
+    """A request the service answers with an HTTP error status"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class TicketService:
+    """Warm ticket-processing service
+    
+    POST /tickets takes one {"customer_id", "query"} object, POST
+    /tickets/batch a list of them (or {"tickets": [...]}); both answer with
+    the processed ticket records and the request's latency. GET /health and
+    GET /stats report liveness and per-request latency percentiles, and
+    GET /metrics the node metrics when a NodeMetrics is given. Tickets run on
+    `workers` threads that share one compiled graph, or compile one each with
+    metrics (see process_tickets for engine, cache_options and
+    dedup_options); with a ResultStore every
+    processed ticket is also stored.
+    """
+    
+    def __init__(self, workers: int = 4, engine: str = "langgraph", cache_options: dict = None,
+                 dedup_options: dict = None, metrics: NodeMetrics = None, store: ResultStore = None,
+                 max_batch: int = 1000, max_body: int = 16 * 1024 * 1024, pipeline_depth: int = 32):
+        self.metrics = metrics
+        self.store = store
+        self.max_batch = max_batch
+        self.max_body = max_body
+        self.pipeline_depth = pipeline_depth
+        self.stats = Counter()
+        self.summary = IncrementalStats()
+        self.in_flight = 0
+        self.started = time.monotonic()
+        self._latencies = deque(maxlen=10000)
+        self._server = None
+        # Compile every worker's graph now rather than on its first request
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ticket-service",
+                                        initializer=_init_worker,
+                                        initargs=(None, cache_options, engine, metrics, dedup_options))
+        list(self._pool.map(time.sleep, [0.01] * workers))
+    
+    async def start(self, host: str = "127.0.0.1", port: int = 8080, path: str = None):
+        """Listen on host:port, or on the Unix socket at path if one is given"""
+        if path:
+            self._server = await asyncio.start_unix_server(self._serve_connection, path)
+        else:
+            self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server
+    
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+    
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        self._pool.shutdown()
+    
+    async def process(self, queries: list) -> list:
+        """Run tickets through a warm worker graph without blocking the event loop"""
+        results, stats, metrics, summary = await asyncio.get_running_loop().run_in_executor(
+            self._pool, functools.partial(_process_chunk_in_worker, queries, summarize=True))
+        self.stats.update(stats)
+        self.summary.merge(summary)
+        if self.metrics is not None:
+            self.metrics.merge(metrics)
+        records = [ticket_record(result) for result in results]
+        if self.store is not None:
+            await asyncio.get_running_loop().run_in_executor(self._pool, self.store.add, records)
+        return records
+    
+    def latency(self) -> dict:
+        """Requests served and their latency percentiles (microseconds) over the last 10,000"""
+        return {**latency_summary(list(self._latencies)), "requests": self.stats["requests"]}
+    
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Responses queue up in request order while the requests themselves run concurrently
+        responses = asyncio.Queue(maxsize=self.pipeline_depth)
+        sender = asyncio.create_task(self._send_responses(responses, writer))
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ServiceError as e:
+                    await responses.put(asyncio.ensure_future(self._error(e)))
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break
+                if request is None:
+                    break
+                await responses.put(asyncio.ensure_future(self._respond(*request)))
+                if not request[3]:
+                    break
+        finally:
+            await responses.put(None)
+            await sender
+            writer.close()
+    
+    async def _send_responses(self, responses: asyncio.Queue, writer: asyncio.StreamWriter):
+        connected = True
+        while (response := await responses.get()) is not None:
+            data = await response
+            if not connected:
+                continue   # keep draining so the reader never blocks on a full queue
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                connected = False
+    
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """Return (method, path, body, keep_alive) for the next request, or None at end of stream"""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, path, version = line.decode("latin-1").split()
+        except ValueError:
+            raise ServiceError(400, "Malformed request line")
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ServiceError(400, "Invalid Content-Length")
+        if length > self.max_body:
+            raise ServiceError(413, f"Request body over {self.max_body} bytes")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, path.split("?")[0], body, keep_alive
+    
+    async def _respond(self, method: str, path: str, body: bytes, keep_alive: bool) -> bytes:
+        started = time.perf_counter()
+        submission = path.startswith("/tickets")
+        self.in_flight += submission
+        try:
+            payload = await self._route(method, path, body)
+            status = 200
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= submission
+        elapsed = time.perf_counter() - started
+        if submission:
+            self._latencies.append(elapsed)
+            self.stats["requests"] += 1
+            self.stats["errors"] += status != 200
+            if isinstance(payload, dict):
+                payload["latency_ms"] = round(elapsed * 1000, 3)
+        return self._encode(status, payload, elapsed, keep_alive)
+    
+    async def _error(self, error: ServiceError) -> bytes:
+        return self._encode(error.status, {"error": str(error)}, 0.0, keep_alive=False)
+    
+    async def _route(self, method: str, path: str, body: bytes):
+        if path in ("/tickets", "/tickets/batch"):
+            if method != "POST":
+                raise ServiceError(405, f"{path} takes POST")
+            try:
+                document = json.loads(body)
+            except ValueError as e:
+                raise ServiceError(400, f"Invalid JSON: {e}")
+            if path == "/tickets":
+                return {"ticket": (await self.process([self._ticket(document)]))[0]}
+            tickets = document.get("tickets") if isinstance(document, dict) else document
+            if not isinstance(tickets, list) or not tickets:
+                raise ServiceError(400, "Expected a non-empty list of tickets")
+            if len(tickets) > self.max_batch:
+                raise ServiceError(413, f"Batches hold at most {self.max_batch} tickets")
+            return {"tickets": await self.process([self._ticket(ticket) for ticket in tickets])}
+        if method != "GET":
+            raise ServiceError(405, f"{path} takes GET")
+        if path == "/health":
+            return {"status": "ok", "uptime_s": round(time.monotonic() - self.started, 3),
+                    "in_flight": self.in_flight}
+        if path == "/stats":
+            return {"latency": self.latency(), "tickets": self.summary.to_dict(), "counters": dict(self.stats)}
+        if path == "/metrics" and self.metrics is not None:
+            return self.metrics.exposition()
+        raise ServiceError(404, f"No such endpoint: {path}")
+    
+    @staticmethod
+    def _ticket(document) -> dict:
+        if not isinstance(document, dict) or not isinstance(document.get("customer_id"), str) \
+                or not isinstance(document.get("query"), str):
+            raise ServiceError(400, 'Each ticket needs string "customer_id" and "query" fields')
+        return {"customer_id": document["customer_id"], "query": document["query"]}
+    
+    @staticmethod
+    def _encode(status: int, payload, elapsed: float, keep_alive: bool) -> bytes:
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {SERVICE_STATUS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Server-Timing: total;dur={elapsed * 1000:.3f}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + body
+
+
+# ============= WORKLOAD GENERATOR & BENCHMARKS =============
+# Seeded synthetic tickets for throughput measurement and regression checks.
+# Phrases carry their intent's keyword; filler words carry no keyword at all.
+WORKLOAD_PHRASES = {
+    "returns": ["I want to return this item", "can I get a refund", "you sent me the wrong item",
+                "how do I send back my package"],
+    "billing": ["there is an extra charge on my card", "my last bill looks off", "my payment did not go through",
+                "why is my balance negative", "what is this late fee"],
+    "tech_support": ["my wifi keeps dropping", "the app shows an error", "my laptop is broken",
+                     "the login page is not working", "the app will crash on start", "can you help me troubleshoot"],
+    "order_status": ["where is my package", "what is the status of my purchase", "is there tracking for my item",
+                     "my parcel has not arrived", "when is the delivery date"],
+    "general": ["I have a question about my account", "can I change my email address",
+                "do you have gift cards", "I would like to speak to someone"],
+}
+WORKLOAD_FILLER = ["my", "the", "a", "item", "account", "today", "recently", "and", "it", "was", "for", "with",
+                   "this", "week", "last", "just", "also", "since", "monday", "really"]
+WORKLOAD_NEGATIVE = ["this is terrible", "absolutely awful", "I am furious", "this is ridiculous",
+                     "completely unacceptable", "worst service ever"]
+
+
+def generate_workload(count: int, seed: int = 0, intent_mix: dict = None, query_words: tuple = (6, 24),
+                      order_reference_rate: float = 0.2, negative_rate: float = 0.1,
+                      customer_count: int = 1000) -> list:
+    """Generate `count` synthetic {"customer_id", "query"} tickets.
+    
+    intent_mix maps intents to relative weights (default: uniform);
+    query_words bounds the number of words per query; order_reference_rate
+    and negative_rate are the shares of tickets mentioning an ORD* number or
+    a negative phrase; customer IDs are drawn from CUST001..CUST<customer_count>
+    (the first eight exist in the sample FakeDatabase).
+    """
+    rng = random.Random(seed)
+    intent_mix = intent_mix or {intent: 1.0 for intent in WORKLOAD_PHRASES}
+    intents = list(intent_mix)
+    weights = [intent_mix[intent] for intent in intents]
+    order_ids = list(FakeDatabase().orders)
+    
+    tickets = []
+    for intent in rng.choices(intents, weights, k=count):
+        # Filler only goes between whole phrases, so multi-word keywords stay intact
+        segments = [rng.choice(WORKLOAD_PHRASES[intent])]
+        if rng.random() < negative_rate:
+            segments.append(rng.choice(WORKLOAD_NEGATIVE))
+        if rng.random() < order_reference_rate:
+            order_id = rng.choice(order_ids) if rng.random() < 0.8 else f"ORD{rng.randint(20000, 99999)}"
+            segments.append(f"number {order_id}")
+        length = sum(len(segment.split()) for segment in segments)
+        for _ in range(rng.randint(*query_words) - length):
+            segments.insert(rng.randrange(len(segments) + 1), rng.choice(WORKLOAD_FILLER))
+        words = " ".join(segments).split()
+        tickets.append({"customer_id": f"CUST{rng.randint(1, customer_count):03d}", "query": " ".join(words)})
+    return tickets
+
+
+def latency_summary(samples: list) -> dict:
+    """Throughput and p50/p95/p99 latency (in microseconds) for per-call timings in seconds"""
+    ordered = sorted(samples)
+    total = sum(ordered)
+    
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1e6 if ordered else 0.0
+    
+    return {
+        "calls": len(ordered),
+        "per_sec": len(ordered) / total if total else 0.0,
+        "p50_us": percentile(50),
+        "p95_us": percentile(95),
+        "p99_us": percentile(99),
+        "max_us": ordered[-1] * 1e6 if ordered else 0.0,
+    }
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB (0 where unavailable)"""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _time_calls(function, arguments) -> list:
+    samples = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_benchmarks(count: int = 10000, seed: int = 0, engine: str = "langgraph", **workload_options) -> dict:
+    """Benchmark process_ticket end to end and each node function on its own
+    
+    Returns a JSON-serializable report; workload_options go to generate_workload.
+    """
+    tickets = generate_workload(count, seed=seed, **workload_options)
+    graph = create_support_graph(engine)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "tickets": count,
+            "seed": seed,
+            "engine": engine,
+            "workload": workload_options,
+        },
+        "benchmarks": {},
+    }
+    benchmarks = report["benchmarks"]
+    
+    started = time.perf_counter()
+    with prefetch(tickets):
+        samples = _time_calls(lambda query_data: process_ticket(query_data, graph, verbose=False), tickets)
+    benchmarks["process_ticket"] = latency_summary(samples)
+    benchmarks["process_ticket"]["wall_seconds"] = time.perf_counter() - started
+    
+    # Each node runs on its own input states, prepared by the nodes before it
+    def fresh_states():
+        return [new_ticket_state(query_data) for query_data in tickets]
+    
+    # Keyword scans are memoized per query; start each node from a cold cache
+    lexicon.scan.cache_clear()
+    classified = fresh_states()
+    benchmarks["classify_intent"] = latency_summary(_time_calls(classify_intent, classified))
+    
+    agents = {"billing_agent": billing_agent, "tech_agent": tech_agent,
+              "returns_agent": returns_agent, "general_agent": general_agent}
+    answered = []
+    for name, agent in agents.items():
+        routed = [state for state in classified if route_to_agent(state) == name]
+        lexicon.scan.cache_clear()
+        benchmarks[name] = latency_summary(_time_calls(agent, routed))
+        answered.extend(routed)
+    lexicon.scan.cache_clear()
+    benchmarks["sentiment_checker"] = latency_summary(_time_calls(sentiment_checker, answered))
+    
+    report["peak_rss_kb"] = peak_rss_kb()
+    return report
+
+
+# ============= STARTUP BUDGET =============
+# Importing this module and answering a first ticket on the fast engine must
+# stay cheap: CLI runs, worker processes and the service all pay it. Heavy
+# dependencies are imported where they are used, and check_startup measures
+# fresh interpreters under `python -X importtime` to keep it that way.
+STARTUP_BUDGET_MS = {"import": 150.0, "first_ticket": 250.0}
+LAZY_MODULES = ("langgraph", "numpy", "http.server")
+
+
+def _import_tree(stderr: str, module: str) -> list:
+    """(depth, cumulative ms, name) for `module` and everything it imported, from -X importtime output"""
+    tree = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        tree.append((depth, int(cumulative) / 1000, name.strip()))
+        if depth == 0:
+            # A top-level import ends its subtree; keep only the module's own
+            if name.strip() == module:
+                return tree
+            tree = []
+    raise ValueError(f"{module} does not appear in the -X importtime output")
+
+
+def startup_profile(runs: int = 5) -> dict:
+    """Best-of-`runs` import and first-ticket times of this module in fresh interpreters
+    
+    Bytecode goes to a temporary cache and one warm-up run is discarded, so
+    the timings are those of an installed module rather than a first compile.
+    Returns {"import_ms", "first_ticket_ms", "imports": {module imported at
+    top level: ms}, "lazy_loaded": [LAZY_MODULES pulled in by the import]}.
+    """
+    import subprocess
+    import tempfile
+    
+    directory, filename = os.path.split(os.path.abspath(__file__))
+    module = os.path.splitext(filename)[0]
+    first_ticket = (f"import time; started = time.perf_counter(); import {module}; "
+                    f"{module}.process_ticket({module}.SAMPLE_QUERIES[0], "
+                    f"{module}.create_support_graph('fast'), verbose=False); "
+                    f"print((time.perf_counter() - started) * 1000)")
+    with tempfile.TemporaryDirectory() as cache:
+        env = {**os.environ, "PYTHONPYCACHEPREFIX": cache}
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        
+        def run(*arguments) -> subprocess.CompletedProcess:
+            return subprocess.run([sys.executable, *arguments], cwd=directory, env=env,
+                                  capture_output=True, text=True, check=True)
+        
+        run("-c", f"import {module}")
+        trees = [_import_tree(run("-X", "importtime", "-c", f"import {module}").stderr, module)
+                 for _ in range(runs)]
+        first_ticket_ms = min(float(run("-c", first_ticket).stdout) for _ in range(runs))
+    
+    tree = min(trees, key=lambda tree: tree[-1][1])
+    loaded = {name for tree in trees for _, _, name in tree}
+    lazy_loaded = [lazy for lazy in LAZY_MODULES
+                   if any(name == lazy or name.startswith(lazy + ".") for name in loaded)]
+    return {
+        "import_ms": tree[-1][1],
+        "first_ticket_ms": first_ticket_ms,
+        "imports": dict(sorted(((name, ms) for depth, ms, name in tree if depth == 1),
+                               key=lambda item: -item[1])),
+        "lazy_loaded": lazy_loaded,
+    }
+
+
+def check_startup(budget_ms: dict = None, runs: int = 5) -> tuple:
+    """Return (startup_profile report, list of budget violations)"""
+    budget_ms = {**STARTUP_BUDGET_MS, **(budget_ms or {})}
+    report = startup_profile(runs)
+    violations = [f"{name.replace('_', ' ')} took {report[f'{name}_ms']:.0f} ms (budget {limit:.0f} ms)"
+                  for name, limit in budget_ms.items() if report[f"{name}_ms"] > limit]
+    violations += [f"importing the module loads {name}, which should be imported where it is used"
+                   for name in report["lazy_loaded"]]
+    return report, violations
+
+
+# ============= LOAD SIMULATION =============
+# Discrete-event model of the support floor: tickets arrive on a simulated
+# clock, queue for the agent pool their intent routes to, and may continue to
+# human review. The graph's own classifier and router decide each ticket's
+# pool, priority and SLA deadline; staffing and service times are inputs.
+
+SIMULATED_POOLS = ("billing_agent", "tech_agent", "returns_agent", "general_agent", "human_review")
+WAIT_BUCKETS = (0.0, 10, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 28800, 43200, 86400, 172800)
+
+
+def exponential_service(mean: float):
+    """Service times with the given mean in seconds, exponentially distributed"""
+    rate = 1 / mean
+    return lambda rng: rng.expovariate(rate)
+
+
+def lognormal_service(mean: float, sigma: float = 0.5):
+    """Right-skewed service times with the given mean in seconds"""
+    mu = math.log(mean) - sigma * sigma / 2
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+def fixed_service(seconds: float):
+    return lambda rng: seconds
+
+
+# pool -> (agents, service time distribution)
+DEFAULT_STAFFING = {
+    "billing_agent": (4, lognormal_service(360)),
+    "tech_agent": (6, lognormal_service(720)),
+    "returns_agent": (3, lognormal_service(300)),
+    "general_agent": (4, lognormal_service(240)),
+    "human_review": (2, lognormal_service(1200)),
+}
+
+
+def poisson_arrivals(rate_per_hour: float, rng: random.Random):
+    """Endless (seconds, None) arrivals of a Poisson process; the simulation
+    draws a generated query for each"""
+    rate = rate_per_hour / 3600
+    now = 0.0
+    while True:
+        now += rng.expovariate(rate)
+        yield now, None
+
+
+def read_arrival_trace(path: str) -> list:
+    """(seconds since the first arrival, query record or None) pairs from a trace
+    
+    Accepts a tickets_data_*.json export or JSONL whose records carry an ISO
+    "timestamp" (or numeric "arrival" seconds), optionally with customer_id
+    and query, or plain text with one timestamp or seconds value per line.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        records = json.loads(text)
+    elif stripped.startswith("{"):
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        records = [{"arrival": line.strip()} for line in text.splitlines() if line.strip()]
+    
+    arrivals = []
+    for record in records:
+        moment = epoch_seconds(record["arrival"] if "arrival" in record else record["timestamp"])
+        query = {"customer_id": record["customer_id"], "query": record["query"]} if "query" in record else None
+        arrivals.append((moment, query))
+    arrivals.sort(key=lambda arrival: arrival[0])
+    start = arrivals[0][0] if arrivals else 0.0
+    return [(moment - start, query) for moment, query in arrivals]
+
+
+class SimulatedPool:
+    """Queue and agents of one pool, with time-weighted statistics"""
+    __slots__ = ("name", "capacity", "service_time", "busy", "queue", "arrivals", "served",
+                 "last_change", "queue_area", "busy_area", "max_queue", "wait_total", "wait_max", "wait_counts")
+    
+    def __init__(self, name: str, capacity: int, service_time):
+        self.name = name
+        self.capacity = capacity
+        self.service_time = service_time
+        self.busy = 0
+        self.queue = deque()      # a heap of (key, arrival, ticket) under the "sla" discipline
+        self.arrivals = 0
+        self.served = 0
+        self.last_change = 0.0
+        self.queue_area = 0.0
+        self.busy_area = 0.0
+        self.max_queue = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+    
+    def wait_percentile(self, q: float) -> float:
+        """Estimate the q-th (0-100) wait percentile in seconds from the buckets"""
+        total = sum(self.wait_counts)
+        if not total:
+            return 0.0
+        rank = q / 100 * total
+        seen = 0
+        for index, count in enumerate(self.wait_counts):
+            if count and seen + count >= rank:
+                if index == 0:
+                    return 0.0
+                lower = WAIT_BUCKETS[index - 1]
+                upper = WAIT_BUCKETS[index] if index < len(WAIT_BUCKETS) else self.wait_max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.wait_max)
+            seen += count
+        return self.wait_max
+    
+    def report(self, elapsed: float) -> dict:
+        return {
+            "agents": self.capacity,
+            "arrivals": self.arrivals,
+            "served": self.served,
+            "utilization": self.busy_area / (self.capacity * elapsed) if elapsed and self.capacity else 0.0,
+            "mean_queue": self.queue_area / elapsed if elapsed else 0.0,
+            "max_queue": self.max_queue,
+            "still_queued": len(self.queue),
+            "mean_wait_s": self.wait_total / self.served if self.served else 0.0,
+            "p50_wait_s": self.wait_percentile(50),
+            "p95_wait_s": self.wait_percentile(95),
+            "p99_wait_s": self.wait_percentile(99),
+            "max_wait_s": self.wait_max,
+        }
+
+
+class SupportSimulation:
+    """Discrete-event simulation of ticket arrivals against finite agent pools
+    
+    staffing maps each of SIMULATED_POOLS to (agents, service_time), where
+    service_time(rng) returns seconds (see exponential_service and friends);
+    missing pools use DEFAULT_STAFFING. Each ticket is routed by the graph's
+    classifier, and after its agent goes to human_review with probability
+    escalation_rate. discipline "fifo" serves each queue in arrival order,
+    "sla" by deadline as SLAScheduler does (with the same aging).
+    """
+    
+    def __init__(self, staffing: dict = None, escalation_rate: float = 0.05, discipline: str = "fifo",
+                 aging: float = 0.0, seed: int = 0, workload: list = None):
+        if discipline not in ("fifo", "sla"):
+            raise ValueError(f"Unknown queue discipline: {discipline}")
+        staffing = {**DEFAULT_STAFFING, **(staffing or {})}
+        self.pools = {name: SimulatedPool(name, *staffing[name]) for name in SIMULATED_POOLS}
+        self.escalation_rate = escalation_rate
+        self.discipline = discipline
+        self.aging = aging
+        self.rng = random.Random(seed)
+        # Generated queries come from the eight sample customers, half of them premium
+        self.workload = workload if workload is not None else generate_workload(2000, seed=seed, customer_count=8)
+        self.targets = sla_targets()
+        self._profiles = {}
+    
+    def profile(self, query_data: dict) -> tuple:
+        """(pool, tier, SLA target seconds) for a query, as the graph would route it"""
+        key = (query_data["customer_id"], query_data["query"])
+        profile = self._profiles.get(key)
+        if profile is None:
+            state = classify_intent({"query": query_data["query"], "resolution_notes": []})
+            tier = db.get_customer(query_data["customer_id"]).get("tier", "standard")
+            target = self.targets.get(tier, self.targets["standard"]) * PRIORITY_SLA_FACTORS.get(state["priority"], 1.0)
+            profile = self._profiles[key] = (self.pools[route_to_agent(state)], tier, target)
+        return profile
+    
+    def run(self, duration: float = None, arrival_rate: float = None, trace: list = None) -> dict:
+        """Simulate `duration` seconds of arrivals and return the report
+        
+        Arrivals are Poisson at arrival_rate tickets per hour, or replayed
+        from a trace of (seconds, query or None) pairs (see read_arrival_trace),
+        in which case the default is to run until every ticket is done.
+        Tickets still in the system past their deadline count as SLA misses.
+        """
+        if trace is not None:
+            arrivals = iter(trace)
+        elif arrival_rate:
+            arrivals = poisson_arrivals(arrival_rate, self.rng)
+        else:
+            raise ValueError("Pass an arrival_rate or a trace")
+        if duration is None and trace is None:
+            raise ValueError("Pass a duration for Poisson arrivals")
+        until = duration if duration is not None else math.inf
+        
+        rng, random_value, pools = self.rng, self.rng.random, self.pools
+        workload, profile = self.workload, self.profile
+        human_review, escalation_rate = pools["human_review"], self.escalation_rate
+        fifo, aging = self.discipline == "fifo", self.aging
+        for pool in pools.values():
+            pool.queue = deque() if fifo else []
+        push, pop = heapq.heappush, heapq.heappop
+        bucket_of = bisect.bisect_right
+        
+        events = []            # (time, sequence, pool or None for an arrival, ticket)
+        sequence = 0
+        completed = Counter()
+        attained = Counter()
+        events_processed = 0
+        
+        def account(pool: SimulatedPool, now: float):
+            elapsed = now - pool.last_change
+            pool.queue_area += len(pool.queue) * elapsed
+            pool.busy_area += pool.busy * elapsed
+            pool.last_change = now
+        
+        def start(pool: SimulatedPool, ticket: list, now: float):
+            nonlocal sequence
+            wait = now - ticket[3]
+            pool.busy += 1
+            pool.served += 1
+            pool.wait_total += wait
+            if wait > pool.wait_max:
+                pool.wait_max = wait
+            pool.wait_counts[bucket_of(WAIT_BUCKETS, wait)] += 1
+            sequence += 1
+            push(events, (now + pool.service_time(rng), sequence, pool, ticket))
+        
+        def enqueue(pool: SimulatedPool, ticket: list, now: float):
+            # ticket: [arrival, deadline, tier, enqueued at]
+            account(pool, now)
+            pool.arrivals += 1
+            ticket[3] = now
+            if pool.busy < pool.capacity:
+                start(pool, ticket, now)
+                return
+            if fifo:
+                pool.queue.append(ticket)
+            else:
+                push(pool.queue, (ticket[1] + aging * ticket[0], ticket[0], ticket))
+            if len(pool.queue) > pool.max_queue:
+                pool.max_queue = len(pool.queue)
+        
+        def next_waiting(pool: SimulatedPool) -> list:
+            return pool.queue.popleft() if fifo else pop(pool.queue)[2]
+        
+        first = next(arrivals, None)
+        if first is not None:
+            push(events, (first[0], 0, None, first[1]))
+        
+        now = 0.0
+        started = time.perf_counter()
+        while events:
+            if events[0][0] > until:
+                break
+            now, _, pool, ticket = events[0]
+            pop(events)
+            events_processed += 1
+            if pool is None:
+                # Arrival: route it, then schedule the next one
+                query_data = ticket if ticket is not None else workload[int(random_value() * len(workload))]
+                target_pool, tier, target = profile(query_data)
+                enqueue(target_pool, [now, now + target, tier, now], now)
+                arrival = next(arrivals, None)
+                if arrival is not None:
+                    sequence += 1
+                    push(events, (arrival[0], sequence, None, arrival[1]))
+                continue
+            
+            # Departure: free the agent, pull the next waiting ticket, pass this one on
+            account(pool, now)
+            pool.busy -= 1
+            if pool.queue:
+                start(pool, next_waiting(pool), now)
+            if pool is not human_review and random_value() < escalation_rate:
+                enqueue(human_review, ticket, now)
+            else:
+                completed[ticket[2]] += 1
+                attained[ticket[2]] += now <= ticket[1]
+        wall = time.perf_counter() - started
+        end = duration if duration is not None else now
+        
+        for pool in pools.values():
+            account(pool, end)
+        in_service = [ticket for _, _, pool, ticket in events if pool is not None]
+        waiting = [entry if fifo else entry[2] for pool in pools.values() for entry in pool.queue]
+        overdue = Counter(ticket[2] for ticket in in_service + waiting if ticket[1] < end)
+        judged = completed + overdue
+        total_judged = sum(judged.values())
+        return {
+            "simulated_hours": end / 3600,
+            "events": events_processed,
+            "events_per_sec": events_processed / wall if wall else 0.0,
+            "completed": sum(completed.values()),
+            "in_system": len(in_service) + len(waiting),
+            "overdue_in_system": sum(overdue.values()),
+            "sla_attainment": sum(attained.values()) / total_judged if total_judged else 1.0,
+            "sla_attainment_by_tier": {tier: attained[tier] / count for tier, count in judged.items()},
+            "pools": {name: pool.report(end) for name, pool in pools.items()},
+        }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Customer Support Ticketing System Simulator")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of tickets processed concurrently (default: 1, sequential)")
+    parser.add_argument("--executor", choices=["process", "thread", "async"], default="process",
+                        help="how tickets are fanned out when processing concurrently (default: process)")
+    parser.add_argument("--input", metavar="PATH",
+                        help="stream {customer_id, query} records from a JSONL file ('-' for stdin)")
+    parser.add_argument("--output", metavar="PATH",
+                        help="where streamed results are written as JSONL ('-' for stdout, "
+                             "default: ticket_results/tickets_stream_<timestamp>.jsonl)")
+    parser.add_argument("--window", type=int, default=64,
+                        help="maximum tickets in flight while streaming (default: 64)")
+    parser.add_argument("--archive", metavar="DIR",
+                        help="append tickets to a segmented NDJSON archive instead of one text file per ticket")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="interval",
+                        help="archive durability policy (default: interval)")
+    parser.add_argument("--flush-interval", type=float, default=1.0,
+                        help="seconds between archive flushes (default: 1.0)")
+    parser.add_argument("--show-ticket", metavar="TICKET_ID",
+                        help="print the text report for a ticket stored in --archive or --store and exit")
+    parser.add_argument("--store", metavar="PATH",
+                        help="also write results to a queryable SQLite results store")
+    parser.add_argument("--store-import", action="append", default=[], metavar="FILE",
+                        help="load a tickets_data_*.json or JSONL results file into --store and exit, repeatable")
+    parser.add_argument("--find", action="append", default=[], metavar="FIELD=VALUE",
+                        help=f"list tickets in --store matching a filter and exit, repeatable; fields: "
+                             f"{', '.join(STORE_FILTERS)}, since, until (ISO time or e.g. '7 days')")
+    parser.add_argument("--count", action="store_true", help="with --find, print only the number of matches")
+    parser.add_argument("--limit", type=int, default=20, help="tickets per --find page (default: 20)")
+    parser.add_argument("--cursor", help="continue a --find listing from the cursor it printed")
+    parser.add_argument("--db", metavar="PATH",
+                        help="use a SQLite customer/order database instead of the in-memory sample data")
+    parser.add_argument("--load-customers", metavar="FILE",
+                        help="bulk-load a CSV/JSONL customer fixture into --db before processing")
+    parser.add_argument("--load-orders", metavar="FILE",
+                        help="bulk-load a CSV/JSONL order fixture into --db before processing")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="run as a long-lived HTTP ticket service on PORT (uses --workers threads)")
+    parser.add_argument("--serve-host", default="127.0.0.1", help="address --serve listens on (default: 127.0.0.1)")
+    parser.add_argument("--serve-socket", metavar="PATH", help="serve on a Unix socket at PATH instead of a port")
+    parser.add_argument("--report", action="append", default=[], metavar="PATH",
+                        help="report trends across tickets_data_*.json exports (files, globs or directories; "
+                             "repeatable) and exit; uses --workers processes")
+    parser.add_argument("--report-by", choices=REPORT_PERIODS, default="day",
+                        help="trend granularity for --report (default: day)")
+    parser.add_argument("--report-output", metavar="PATH", help="also write the --report as JSON")
+    parser.add_argument("--rescan", action="store_true",
+                        help="parse every --report file again instead of trusting current summary sidecars")
+    parser.add_argument("--host-id", type=int, default=0,
+                        help=f"this machine's ticket ID host number, unique among machines sharing results "
+                             f"(0-{(1 << HOST_BITS) - 1}, default: 0)")
+    parser.add_argument("--engine", choices=ENGINES, default="langgraph",
+                        help="graph runtime: LangGraph or the direct-call fast path (default: langgraph)")
+    parser.add_argument("--compare-engines", type=int, metavar="N",
+                        help="check both engines agree on N generated tickets, benchmark them and exit")
+    parser.add_argument("--check-startup", action="store_true",
+                        help="time importing this module and a first ticket in fresh interpreters; exit "
+                             "non-zero over budget or if a lazily imported dependency loads at import")
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="benchmark the pipeline and each node on N generated tickets and exit")
+    parser.add_argument("--bench-output", metavar="PATH",
+                        help="where the benchmark JSON goes (default: ticket_results/bench_<timestamp>.json)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated workloads (default: 0)")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="cache up to N responses for repeat contacts, per worker (default: 0, off)")
+    parser.add_argument("--cache-ttl", type=float, default=300.0,
+                        help="seconds a cached response stays valid (default: 300)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="coalesce near-duplicate tickets (e.g. outage storms) onto one result, per worker")
+    parser.add_argument("--dedup-threshold", type=float, default=0.8,
+                        help="estimated text similarity at which a ticket joins a cluster (default: 0.8)")
+    parser.add_argument("--dedup-window", type=float, default=600.0,
+                        help="seconds a cluster accepts new near-duplicates (default: 600)")
+    parser.add_argument("--metrics", action="store_true",
+                        help="time every graph node and router and print per-node latency percentiles")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics (implies --metrics)")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="periodically write Prometheus metrics to PATH (implies --metrics)")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                        help="seconds between --metrics-file writes (default: 10)")
+    parser.add_argument("--sla", action="store_true",
+                        help="process pending tickets by SLA deadline (tier, priority, arrival) instead of arrival order")
+    parser.add_argument("--sla-aging", type=float, default=0.0,
+                        help="how fast waiting tickets gain on newer ones; 0 is earliest-deadline-first (default: 0)")
+    parser.add_argument("--sla-window", type=int, default=1024,
+                        help="tickets held for reordering while streaming with --sla (default: 1024)")
+    parser.add_argument("--reviewers", type=int, default=0,
+                        help="hand escalated tickets to a queue worked by N simulated human reviewers (default: 0, off)")
+    parser.add_argument("--review-time", type=float, default=1200.0,
+                        help="mean simulated seconds per human review (default: 1200)")
+    parser.add_argument("--review-queue", type=int, default=100,
+                        help="escalated tickets that may wait for review before the pipeline blocks (default: 100)")
+    parser.add_argument("--review-time-scale", type=float, default=0.001,
+                        help="real seconds slept per simulated review second (default: 0.001)")
+    parser.add_argument("--simulate", type=float, metavar="HOURS",
+                        help="run a discrete-event load simulation of HOURS simulated hours and exit")
+    parser.add_argument("--arrival-rate", type=float, default=300.0,
+                        help="Poisson ticket arrivals per hour for --simulate (default: 300)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="replay arrival times (and queries) from a trace file instead of Poisson arrivals")
+    parser.add_argument("--staff", action="append", default=[], metavar="POOL=AGENTS",
+                        help=f"agents in a simulated pool, repeatable; pools: {', '.join(SIMULATED_POOLS)}")
+    parser.add_argument("--service-time", action="append", default=[], metavar="POOL=SECONDS",
+                        help="mean (lognormal) service time of a simulated pool, repeatable")
+    parser.add_argument("--escalation-rate", type=float, default=0.05,
+                        help="share of simulated tickets that go on to human review (default: 0.05)")
+    parser.add_argument("--discipline", choices=["fifo", "sla"], default="fifo",
+                        help="simulated queue order: arrival or SLA deadline (default: fifo)")
+    parser.add_argument("--sim-output", metavar="PATH", help="also write the simulation report as JSON")
+    args = parser.parse_args(argv)
+    args.metrics = args.metrics or args.metrics_port is not None or args.metrics_file is not None
+    if args.cache_size and args.executor == "async":
+        parser.error("--cache-size is not supported with the async executor")
+    if args.dedup and args.executor == "async":
+        parser.error("--dedup is not supported with the async executor")
+    if (args.load_customers or args.load_orders) and not args.db:
+        parser.error("--load-customers/--load-orders require --db")
+    if args.input and args.executor == "async":
+        parser.error("--input supports the process and thread executors")
+    if not 0 <= args.host_id < 1 << HOST_BITS:
+        parser.error(f"--host-id must be between 0 and {(1 << HOST_BITS) - 1}")
+    if args.show_ticket and not (args.archive or args.store):
+        parser.error("--show-ticket requires --archive or --store")
+    if (args.store_import or args.find or args.count or args.cursor) and not args.store:
+        parser.error("--store-import/--find/--count/--cursor require --store")
+    for option in args.find:
+        field, _, value = option.partition("=")
+        if field not in STORE_FILTERS + ("since", "until") or not value:
+            parser.error(f"expected --find FIELD=VALUE with FIELD one of {', '.join(STORE_FILTERS)}, since, "
+                         f"until, got {option!r}")
+        if field in ("since", "until"):
+            try:
+                find_time(value)
+            except ValueError as e:
+                parser.error(f"--find {field}: {e}")
+    staff, service_time = {}, {}
+    for flag, options, values in (("--staff", args.staff, staff), ("--service-time", args.service_time, service_time)):
+        for option in options:
+            pool, _, value = option.partition("=")
+            if pool not in SIMULATED_POOLS or not value:
+                parser.error(f"expected {flag} POOL=VALUE with POOL one of {', '.join(SIMULATED_POOLS)}, "
+                             f"got {option!r}")
+            values[pool] = value
+    for pool, value in staff.items():
+        if not value.isdigit() or int(value) < 1:
+            parser.error(f"--staff {pool} must be a whole number of agents, at least 1, got {value!r}")
+        staff[pool] = int(value)
+    for pool, value in service_time.items():
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = 0.0
+        if not (seconds > 0 and math.isfinite(seconds)):
+            parser.error(f"--service-time {pool} must be a number of seconds above 0, got {value!r}")
+        service_time[pool] = seconds
+    args.staff, args.service_time = staff, service_time
+    return args
+
+
+def cache_options(args: argparse.Namespace):
+    """ResponseCache settings from the command line, or None when caching is off"""
+    return {"max_entries": args.cache_size, "ttl": args.cache_ttl} if args.cache_size > 0 else None
+
+
+def dedup_options(args: argparse.Namespace):
+    """NearDuplicateIndex settings from the command line, or None when coalescing is off"""
+    return {"threshold": args.dedup_threshold, "window": args.dedup_window} if args.dedup else None
+
+
+def print_run_stats(stats: Counter, file=None):
+    """Print the lookup, response cache, near-duplicate and rendering counters collected during a run"""
+    print(f"Lookup cache: {stats['lookup_hits']} hits, {stats['lookup_misses']} misses", file=file)
+    if stats["cache_hits"] or stats["cache_misses"]:
+        print(f"Response cache: {stats['cache_hits']} hits, {stats['cache_misses']} misses, "
+              f"{stats['cache_evictions']} evictions, {stats['cache_expirations']} expirations, "
+              f"{stats['cache_invalidations']} invalidations", file=file)
+    if stats["dedup_tickets"]:
+        print(f"Near-duplicates: {stats['dedup_coalesced']} of {stats['dedup_tickets']} tickets coalesced into "
+              f"{stats['dedup_clusters']} clusters ({stats['dedup_reused']} reused a result, "
+              f"{stats['dedup_mismatched']} classified differently, "
+              f"{stats['dedup_expired']} closed by the window)", file=file)
+    if stats["template_renders"]:
+        print(f"Template rendering: {stats['template_render_seconds'] * 1000:.2f} ms over "
+              f"{stats['template_renders']} responses", file=file)
+
+
+def print_clusters(dedup: NearDuplicateIndex, limit: int = 5, file=None):
+    """Print the largest open near-duplicate clusters"""
+    clusters = [cluster for cluster in dedup.active(limit) if cluster.size > 1]
+    if not clusters:
+        return
+    print(f"Largest near-duplicate clusters (largest ever: {dedup.largest}):", file=file)
+    for cluster in clusters:
+        print(f"  • {cluster.representative}: {cluster.size} tickets ({cluster.intent}, {cluster.priority})",
+              file=file)
+
+
+def print_node_metrics(metrics: NodeMetrics, file=None):
+    """Print per-node call counts and latency percentiles, plus the router counters"""
+    print("Node latency:", file=file)
+    for line in metrics.summary_lines():
+        print(f"  • {line}", file=file)
+    print(f"Escalation rate: {metrics.escalation_rate():.1%} of {metrics.tickets} tickets", file=file)
+
+
+@contextlib.contextmanager
+def exposed_metrics(args: argparse.Namespace):
+    """Yield a NodeMetrics when --metrics is on (else None), exposed over HTTP
+    and/or a file as requested for the duration of the run"""
+    if not args.metrics:
+        yield None
+        return
+    metrics = NodeMetrics()
+    server = serve_metrics(metrics, args.metrics_port) if args.metrics_port is not None else None
+    writer = MetricsFileWriter(metrics, args.metrics_file, args.metrics_interval) if args.metrics_file else None
+    if server:
+        print(f"✓ Serving metrics at http://127.0.0.1:{server.server_port}/metrics", file=sys.stderr)
+    try:
+        yield metrics
+    finally:
+        if writer:
+            writer.close()
+            print(f"✓ Metrics written to: {args.metrics_file}", file=sys.stderr)
+        if server:
+            server.shutdown()
+
+
+def open_scheduler(args: argparse.Namespace) -> SLAScheduler:
+    """An SLAScheduler that warns on stderr about each ticket answered past its deadline"""
+    def warn(ticket: ScheduledTicket, late: float):
+        print(f"⚠ SLA missed by {late / 60:.1f} min: {ticket.query_data['customer_id']} "
+              f"({ticket.tier}, {ticket.priority} priority)", file=sys.stderr)
+    return SLAScheduler(aging=args.sla_aging).on_deadline_miss(warn)
+
+
+def open_review_queue(args: argparse.Namespace) -> ReviewQueue:
+    """The human review queue configured on the command line, or None when it is off"""
+    if args.reviewers <= 0:
+        return None
+    return ReviewQueue(args.reviewers, lognormal_service(args.review_time), max_pending=args.review_queue,
+                       time_scale=args.review_time_scale, seed=args.seed)
+
+
+def print_review_stats(reviews: ReviewQueue, file=None):
+    stats = reviews.stats()
+    print(f"Human review: {stats['reviewed']} reviewed, mean {stats['mean_latency_s'] / 60:.1f} min "
+          f"(max {stats['max_latency_s'] / 60:.1f} min) from hand-off; queue depth peaked at {stats['max_depth']}, "
+          f"{stats['blocked_hand_offs']} hand-offs blocked for {stats['blocked_seconds']:.2f}s", file=file)
+
+
+def print_sla_report(scheduler: SLAScheduler, file=None):
+    print(f"SLA scheduling: {scheduler.answered} tickets answered, "
+          f"{scheduler.missed} past deadline ({scheduler.miss_rate:.1%})", file=file)
+
+
+def run_simulation(args: argparse.Namespace):
+    """Run the load simulation described on the command line and print its report"""
+    agents, means = args.staff, args.service_time
+    staffing = {}
+    for pool in agents.keys() | means.keys():
+        default_agents, default_service = DEFAULT_STAFFING[pool]
+        staffing[pool] = (agents.get(pool, default_agents),
+                          lognormal_service(means[pool]) if pool in means else default_service)
+    
+    simulation = SupportSimulation(staffing, escalation_rate=args.escalation_rate, discipline=args.discipline,
+                                   aging=args.sla_aging, seed=args.seed)
+    if args.trace:
+        trace = read_arrival_trace(args.trace)
+        duration = args.simulate * 3600 if args.simulate else None
+        print(f"Simulating {len(trace)} traced arrivals...")
+        report = simulation.run(duration, trace=trace)
+    else:
+        print(f"Simulating {args.simulate:g} hours at {args.arrival_rate:g} tickets/hour...")
+        report = simulation.run(args.simulate * 3600, arrival_rate=args.arrival_rate)
+    
+    print(f"{'pool':<16}{'agents':>7}{'served':>9}{'util':>7}{'avg queue':>11}{'max queue':>11}"
+          f"{'avg wait':>10}{'p95 wait':>10}{'queued':>8}")
+    for name, pool in report["pools"].items():
+        print(f"{name:<16}{pool['agents']:>7}{pool['served']:>9}{pool['utilization']:>7.0%}"
+              f"{pool['mean_queue']:>11.1f}{pool['max_queue']:>11}{pool['mean_wait_s'] / 60:>8.1f}m"
+              f"{pool['p95_wait_s'] / 60:>9.1f}m{pool['still_queued']:>8}")
+    by_tier = ", ".join(f"{tier} {share:.1%}" for tier, share in report["sla_attainment_by_tier"].items())
+    print(f"SLA attainment: {report['sla_attainment']:.1%} ({by_tier}); {report['completed']} tickets completed, "
+          f"{report['in_system']} still in the system ({report['overdue_in_system']} overdue)")
+    print(f"{report['events']} events in {report['simulated_hours']:g} simulated hours "
+          f"({report['events_per_sec'] * 60 / 1e6:.1f}M events/min)")
+    if args.sim_output:
+        with open(args.sim_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Simulation report saved to: {args.sim_output}")
+
+
+def run_engine_comparison(count: int):
+    """Compare the engines on a generated corpus, exiting non-zero on any mismatch"""
+    queries = generate_workload(count, customer_count=10, negative_rate=0.3, order_reference_rate=0.3)
+    report = compare_engines(queries)
+    print(f"Compared engines on {report['tickets']} tickets: {len(report['mismatches'])} mismatches")
+    for engine in ENGINES:
+        print(f"  • {engine}: {report[f'{engine}_us_per_ticket']:.1f} µs/ticket")
+    if report["mismatches"]:
+        raise SystemExit(f"Engines disagree on tickets {report['mismatches'][:10]}")
+
+
+def run_startup_check():
+    """Report startup time against STARTUP_BUDGET_MS, exiting non-zero on any violation"""
+    report, violations = check_startup()
+    print(f"Import: {report['import_ms']:.1f} ms (budget {STARTUP_BUDGET_MS['import']:.0f} ms)")
+    print(f"Import + first ticket (fast engine): {report['first_ticket_ms']:.1f} ms "
+          f"(budget {STARTUP_BUDGET_MS['first_ticket']:.0f} ms)")
+    for name, ms in list(report["imports"].items())[:5]:
+        print(f"  • {name}: {ms:.1f} ms")
+    if violations:
+        raise SystemExit("Startup budget exceeded:\n  " + "\n  ".join(violations))
+    print("✓ Startup within budget")
+
+
+def run_benchmark_suite(args: argparse.Namespace):
+    """Run the benchmark suite and write its JSON report"""
+    print(f"Benchmarking {args.bench} generated tickets on the {args.engine} engine...")
+    report = run_benchmarks(args.bench, seed=args.seed, engine=args.engine)
+    
+    output = args.bench_output
+    if output is None:
+        os.makedirs("ticket_results", exist_ok=True)
+        output = os.path.join("ticket_results", f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"{'benchmark':<20}{'calls':>8}{'per sec':>12}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}")
+    for name, result in report["benchmarks"].items():
+        print(f"{name:<20}{result['calls']:>8}{result['per_sec']:>12.0f}"
+              f"{result['p50_us']:>10.1f}{result['p95_us']:>10.1f}{result['p99_us']:>10.1f}")
+    print(f"Peak RSS: {report['peak_rss_kb'] / 1024:.1f} MiB")
+    print(f"✓ Benchmark report saved to: {output}")
+
+
+def open_database(args: argparse.Namespace):
+    """Switch to the SQLite database named by --db, loading any fixtures first"""
+    database = SQLiteDatabase(args.db)
+    # Only a database with no data of its own gets the sample data, which
+    # would otherwise overwrite loaded orders with the same IDs
+    seed = database.count_customers() == 0 and database.count_orders() == 0
+    for path, kind in ((args.load_customers, "customers"), (args.load_orders, "orders")):
+        if path:
+            seed = False
+            count = database.load_fixture(path, kind)
+            print(f"✓ Loaded {count} {kind} from {path}", file=sys.stderr)
+    if seed:
+        database.import_database(FakeDatabase())
+        print(f"✓ Seeded empty database {args.db} with the sample customers and orders", file=sys.stderr)
+    use_database(database)
+
+
+def open_archive(args: argparse.Namespace) -> ArchiveWriter:
+    return ArchiveWriter(args.archive, flush_interval=args.flush_interval, fsync=args.fsync)
+
+
+def store_filters(args: argparse.Namespace) -> dict:
+    """ResultStore.query keyword arguments from the --find options"""
+    filters = {}
+    for option in args.find:
+        field, _, value = option.partition("=")
+        if field == "escalated":
+            value = value.lower() in ("1", "yes", "true")
+        elif field in ("since", "until"):
+            value = find_time(value)
+        filters[field] = value
+    return filters
+
+
+def find_time(value: str) -> datetime:
+    """A --find since/until value: an ISO time, or a duration ago such as '7 days'"""
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.now() - timedelta(seconds=parse_duration(value))
+    except (ValueError, KeyError):
+        raise ValueError(f"expected an ISO time or a duration such as '7 days', got {value!r}") from None
+
+
+def run_store_query(args: argparse.Namespace):
+    """Import into, list or count tickets in the --store results store"""
+    store = ResultStore(args.store)
+    for path in args.store_import:
+        print(f"✓ Imported {store.import_file(path)} tickets from {path}")
+    if not (args.find or args.count or args.cursor):
+        return
+    filters = store_filters(args)
+    if args.count:
+        print(store.count(**filters))
+        return
+    page = store.query(limit=args.limit, cursor=args.cursor, **filters)
+    for record in page["tickets"]:
+        print(f"{record['ticket_id']}  {record['timestamp'][:19]}  {record['customer_id']}  {record['intent']:<12}  "
+              f"{record['priority']:<6}  {'escalated' if record['escalated'] else 'resolved ':<9}  "
+              f"{record['query'][:60]}")
+    if page["next"]:
+        print(f"More: --cursor '{page['next']}'")
+
+
+def run_report(args: argparse.Namespace):
+    """Aggregate the --report exports and print the trend table"""
+    paths = find_exports(args.report)
+    if not paths:
+        sys.exit(f"No ticket exports found in: {', '.join(args.report)}")
+    started = time.perf_counter()
+    report = historic_report(paths, workers=args.workers, period=args.report_by, rescan=args.rescan)
+    elapsed = time.perf_counter() - started
+    
+    overall = report["overall"]
+    print(f"📈 {report['files']} exports, {overall['total']} tickets "
+          f"({report['parsed']} parsed, {report['files'] - report['parsed']} from summary sidecars) "
+          f"in {elapsed:.2f}s")
+    intents = sorted(overall["intents"], key=overall["intents"].get, reverse=True)
+    print(f"\n{'period':<20} {'tickets':>9} {'escalated':>9} {'score':>6} {'p10':>5}  "
+          + "  ".join(f"{intent[:12]:>12}" for intent in intents))
+    for row in report["trend"] + [{"period": "overall", **overall}]:
+        mix = "  ".join(f"{row['intents'].get(intent, 0) / row['total'] if row['total'] else 0:>12.1%}"
+                        for intent in intents)
+        print(f"{row['period']:<20} {row['total']:>9} {row['escalation_rate']:>9.1%} "
+              f"{row['score']['mean']:>6.3f} {row['score']['quantiles']['p10']:>5.2f}  {mix}")
+    if args.report_output:
+        with open(args.report_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Report written to: {args.report_output}")
+
+
+def run_service(args: argparse.Namespace, metrics: NodeMetrics = None):
+    """Serve tickets over HTTP until interrupted"""
+    store = ResultStore(args.store) if args.store else None
+    service = TicketService(workers=max(1, args.workers), engine=args.engine, cache_options=cache_options(args),
+                            dedup_options=dedup_options(args), metrics=metrics, store=store)
+    
+    async def serve():
+        await service.start(args.serve_host, args.serve, args.serve_socket)
+        where = args.serve_socket or f"http://{args.serve_host}:{args.serve}"
+        print(f"🎫 Ticket service on {where} ({max(1, args.workers)} {args.engine} worker(s)); "
+              f"POST /tickets or /tickets/batch, GET /health, /stats", file=sys.stderr)
+        # Stop cleanly on SIGTERM as well as Ctrl+C (signal handlers are Unix-only)
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        with contextlib.suppress(asyncio.CancelledError):
+            await service.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        latency = service.latency()
+        print(f"\n✓ Served {latency['requests']} requests ({service.summary.total} tickets), "
+              f"p50 {latency['p50_us'] / 1000:.2f} ms, p99 {latency['p99_us'] / 1000:.2f} ms", file=sys.stderr)
+
+
+def run_stream(args: argparse.Namespace):
+    """Stream tickets from --input to --output without holding them in memory"""
+    output = args.output
+    if output is None and not args.archive:
+        os.makedirs("ticket_results", exist_ok=True)
+        output = os.path.join("ticket_results", f"tickets_stream_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+    
+    print(f"Streaming tickets from {args.input} ({args.workers} {args.executor} worker(s), window {args.window})...",
+          file=sys.stderr)
+    
+    stats = Counter()
+    summary = IncrementalStats()
+    
+    with exposed_metrics(args) as metrics:
+        started = time.perf_counter()
+        records = read_queries_jsonl(args.input)
+        scheduler = open_scheduler(args) if args.sla else None
+        if scheduler is not None:
+            records = scheduler.reorder(records, args.sla_window)
+        results = stream_tickets(records, workers=args.workers, executor=args.executor, window=args.window,
+                                 stats=stats, cache_options=cache_options(args), engine=args.engine,
+                                 metrics=metrics, summary=summary, dedup_options=dedup_options(args))
+        if scheduler is not None:
+            results = scheduler.match(results)
+        reviews = open_review_queue(args)
+        if reviews is not None:
+            results = reviews.route(results)
+        if scheduler is not None:
+            results = scheduler.track(results)
+        if args.store:
+            results = ResultStore(args.store).tee(results)
+        if args.archive and args.output is None:
+            output = args.archive
+            with open_archive(args) as archive:
+                total = 0
+                for result in results:
+                    archive.submit(result)
+                    total += 1
+        elif output == "-":
+            total = write_results_jsonl(results, sys.stdout)
+        else:
+            with open(output, "w", encoding="utf-8") as sink:
+                total = write_results_jsonl(results, sink)
+        if reviews is not None:
+            reviews.close()
+        elapsed = time.perf_counter() - started
+        
+        print(f"✓ {total} tickets processed ({summary.escalated} escalated) in {elapsed:.2f}s "
+              f"({total / elapsed if elapsed else 0:.1f} tickets/sec)", file=sys.stderr)
+        print("\n".join(summary.summary_lines()), file=sys.stderr)
+        print_run_stats(stats, file=sys.stderr)
+        if scheduler is not None:
+            print_sla_report(scheduler, file=sys.stderr)
+        if reviews is not None:
+            print_review_stats(reviews, file=sys.stderr)
+        if metrics is not None:
+            print_node_metrics(metrics, file=sys.stderr)
+    if output != "-":
+        print(f"✓ Results streamed to: {output}", file=sys.stderr)
+    if args.store:
+        print(f"✓ Results stored in: {args.store} (query with --store {args.store} --find FIELD=VALUE)",
+              file=sys.stderr)
+    if output != "-" and os.path.isfile(output):
+        print(f"✓ Dashboard summary: {write_summary_sidecar(summary, output)}", file=sys.stderr)
+
+
+def run_samples(args: argparse.Namespace, metrics: NodeMetrics = None):
+    """Process the sample queries, print the summary and save the result files"""
+    print("🎫 Customer Support Ticketing System Simulator")
+    print("=" * 80)
+    
+    # Process sample queries
+    print("\nProcessing sample support tickets...\n")
+    
+    archive = open_archive(args) if args.archive else None
+    
+    queries = SAMPLE_QUERIES
+    scheduler = open_scheduler(args) if args.sla else None
+    if scheduler is not None:
+        queries = list(scheduler.reorder(queries, window=len(queries)))
+    
+    stats = Counter()
+    summary = IncrementalStats()
+    reviews = open_review_queue(args)
+    dedup = None
+    started = time.perf_counter()
+    if args.workers > 1 or args.executor == "async":
+        print(f"Running {len(queries)} tickets on {args.workers} {args.executor} worker(s)...")
+        results = process_tickets(queries, workers=args.workers, executor=args.executor,
+                                  stats=stats, cache_options=cache_options(args), engine=args.engine,
+                                  metrics=metrics, summary=summary, reviews=reviews,
+                                  dedup_options=dedup_options(args))
+        if scheduler is not None:
+            # process_tickets returns once escalated tickets are reviewed
+            results = list(scheduler.track(scheduler.match(results)))
+        if archive:
+            for result in results:
+                archive.submit(result)
+    else:
+        # Create the graph
+        support_graph = create_support_graph(args.engine, metrics)
+        response_cache = ResponseCache(**cache_options(args)).watch(db) if args.cache_size > 0 else None
+        dedup = NearDuplicateIndex(**dedup_options(args)) if args.dedup else None
+        
+        results = []
+        with prefetch(queries) as lookups:
+            processed = (process_ticket(query_data, support_graph, response_cache=response_cache, dedup=dedup)
+                         for query_data in queries)
+            if scheduler is not None:
+                processed = scheduler.match(processed)
+            if reviews is not None:
+                processed = reviews.route(processed)
+            if scheduler is not None:
+                processed = scheduler.track(processed)
+            for result in processed:
+                results.append(result)
+                summary.add(result)
+                if archive:
+                    archive.submit(result)
+        stats.update(lookup_hits=lookups.hits, lookup_misses=lookups.misses)
+        stats.update(template_engine.take())
+        if response_cache is not None:
+            stats.update(response_cache.counters())
+        if dedup is not None:
+            stats.update(dedup.counters())
+    if reviews is not None:
+        reviews.close()
+    elapsed = time.perf_counter() - started
+    
+    # Summary statistics
+    print("\n" + "="*80)
+    print("SUMMARY STATISTICS")
+    print("="*80)
+    print("\n".join(summary.summary_lines()))
+    print(f"Throughput: {summary.total / elapsed:.1f} tickets/sec ({elapsed:.2f}s total)")
+    print_run_stats(stats)
+    if dedup is not None:
+        print_clusters(dedup)
+    if scheduler is not None:
+        print_sla_report(scheduler)
+    if reviews is not None:
+        print_review_stats(reviews)
+    if metrics is not None:
+        print_node_metrics(metrics)
+    
+    # Save results to files
+    print("\n" + "="*80)
+    print("SAVING RESULTS TO FILES")
+    print("="*80)
+    
+    store = ResultStore(args.store) if args.store else None
+    output_folder, timestamp = save_results_to_file(results, ticket_reports=archive is None, summary=summary,
+                                                    store=store)
+    
+    print(f"✓ Results saved to folder: {output_folder}/")
+    if archive:
+        archive.close()
+        print(f"✓ Tickets archived: {archive.written} records in {args.archive}/ "
+              f"(view one with --archive {args.archive} --show-ticket <id>)")
+    else:
+        print(f"✓ Individual ticket reports: {len(results)} files")
+    print(f"✓ Summary report: SUMMARY_{timestamp}.txt")
+    print(f"✓ JSON data file: tickets_data_{timestamp}.json (summary: tickets_data_{timestamp}.summary.json)")
+    if store is not None:
+        print(f"✓ Results stored in: {args.store} (query with --store {args.store} --find FIELD=VALUE)")
+    print(f"\n📁 Check the '{output_folder}' folder for all saved files!")
+    print("="*80)
+
+
+def main(argv=None):
+    """Main execution function"""
+    args = parse_args(argv)
+    if args.host_id:
+        use_ticket_ids(TicketIdAllocator(args.host_id))
+    if args.db:
+        open_database(args)
+    if args.check_startup:
+        return run_startup_check()
+    if args.compare_engines:
+        return run_engine_comparison(args.compare_engines)
+    if args.bench:
+        return run_benchmark_suite(args)
+    if args.simulate or args.trace:
+        return run_simulation(args)
+    if args.report:
+        return run_report(args)
+    if args.show_ticket:
+        if args.archive:
+            print(ArchiveReader(args.archive).report(args.show_ticket))
+        else:
+            print(render_ticket_report(ResultStore(args.store).get(args.show_ticket)))
+        return
+    if args.store_import or args.find or args.count or args.cursor:
+        return run_store_query(args)
+    if args.input:
+        return run_stream(args)
+    with exposed_metrics(args) as metrics:
+        if args.serve is not None or args.serve_socket:
+            return run_service(args, metrics)
+        run_samples(args, metrics)
+
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""The vectorized batch path must agree with the per-ticket nodes"""
+import pytest
+
+import support_system as ss
+
+ADVERSARIAL_QUERIES = [
+    "",
+    "   ",
+    "REFUND!!! URGENT!!!",
+    "refunded refunding refunds",
+    "my bill and my wifi and a return, where is my package?",
+    "terrible terrible terrible awful",
+    "not urgent, just a thank you",
+    "immediately",
+    "charge" * 50,
+    "ORD12345 ORD99999 order status tracking",
+    "Café wifi — ça ne marche pas, refund s'il vous plaît",
+    "errors\nerror\terror",
+    "thanks! great, excellent, wonderful help",
+]
+
+
+def per_ticket(query: str) -> tuple:
+    state = ss.classify_intent(ss.new_ticket_state({"customer_id": "CUST001", "query": query}))
+    return state["intent"], state["priority"], ss.sentiment_analyzer.analyze_query(query)
+
+
+@pytest.mark.parametrize("queries", [
+    [ticket["query"] for ticket in ss.generate_workload(2000, seed=7, negative_rate=0.3)],
+    [query["query"] for query in ss.SAMPLE_QUERIES],
+    ADVERSARIAL_QUERIES,
+], ids=["generated", "samples", "adversarial"])
+def test_classify_batch_matches_classify_intent(queries):
+    batch = ss.classify_batch(queries)
+    for i, query in enumerate(queries):
+        intent, priority, sentiment = per_ticket(query)
+        assert (batch["intent"][i], batch["priority"][i]) == (intent, priority), query
+        # score_batch mirrors analyze_query's operation order, so the floats are identical
+        assert float(batch["query_sentiment"][i]) == sentiment, query
+
+
+def test_score_batch_matches_analyze_query():
+    queries = [ticket["query"] for ticket in ss.generate_workload(500, seed=11, negative_rate=0.5)]
+    queries += ADVERSARIAL_QUERIES
+    scores = ss.score_batch(queries)
+    assert [float(score) for score in scores] == [ss.sentiment_analyzer.analyze_query(q) for q in queries]
+
+
+def test_empty_batch():
+    batch = ss.classify_batch([])
+    assert len(batch["intent"]) == len(batch["priority"]) == len(batch["query_sentiment"]) == 0
@@ -0,0 +1,44 @@
+"""Near-duplicate coalescing must answer every ticket as the graph would"""
+import support_system as ss
+
+OUTAGE_QUERY = "The app keeps crashing every time I open it on my phone, please help me fix it"
+
+
+def run(queries: list, dedup: ss.NearDuplicateIndex = None) -> list:
+    graph = ss.create_support_graph("fast")
+    with ss.prefetch(queries):
+        return [ss.process_ticket(query, graph, verbose=False, dedup=dedup) for query in queries]
+
+
+def without_coalescing_note(result: dict) -> dict:
+    notes = [note for note in result["resolution_notes"] if not note.startswith("Near-duplicate of")]
+    return {**result, "ticket_id": None, "resolution_notes": notes}
+
+
+def assert_same_answers(queries: list, dedup: ss.NearDuplicateIndex):
+    expected = [{**result, "ticket_id": None} for result in run(queries)]
+    assert [without_coalescing_note(result) for result in run(queries, dedup)] == expected
+
+
+def test_similar_tickets_keep_their_own_intent_and_priority():
+    queries = [{"customer_id": "CUST001", "query": OUTAGE_QUERY},
+               {"customer_id": "CUST002", "query": OUTAGE_QUERY + " urgent"},
+               {"customer_id": "CUST003", "query": OUTAGE_QUERY + " I want a refund"}]
+    results = run(queries, ss.NearDuplicateIndex())
+    assert results[1]["priority"] == "high" != results[0]["priority"]
+    assert results[2]["intent"] == "returns" != results[0]["intent"]
+    assert_same_answers(queries, ss.NearDuplicateIndex())
+
+
+def test_coalesced_tickets_match_the_graph():
+    # Outage traffic: the same few reports from many customers, some reworded
+    customers = [f"CUST{number:03d}" for number in range(1, 9)] + ["CUST999"]
+    reports = [query["query"] for query in ss.generate_workload(12, seed=5, order_reference_rate=0.5)]
+    queries = [{"customer_id": customers[index % len(customers)],
+                "query": reports[index % len(reports)] + (" please" if index % 3 else "")}
+               for index in range(300)]
+    dedup = ss.NearDuplicateIndex()
+    assert_same_answers(queries, dedup)
+    counters = dedup.counters()
+    assert counters["dedup_reused"] > 100
+    assert counters["dedup_clusters"] < 100
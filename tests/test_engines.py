@@ -0,0 +1,21 @@
+"""The fast-path executor must produce the same final state as the LangGraph workflow"""
+import asyncio
+
+import support_system as ss
+
+
+def test_engines_agree_on_seeded_workload():
+    queries = ss.generate_workload(500, seed=3, customer_count=10, negative_rate=0.3, order_reference_rate=0.3)
+    report = ss.compare_engines(queries, repeat=1)
+    assert report["tickets"] == 500
+    assert report["mismatches"] == []
+
+
+def test_fast_ainvoke_matches_invoke():
+    graph = ss.create_support_graph("fast")
+    states = [ss.new_ticket_state(query) for query in ss.SAMPLE_QUERIES]
+    
+    async def run_all():
+        return await asyncio.gather(*(graph.ainvoke(state) for state in states))
+    
+    assert asyncio.run(run_all()) == [graph.invoke(state) for state in states]
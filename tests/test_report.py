@@ -0,0 +1,14 @@
+"""Historic reports count each ticket under the tier recorded in its export"""
+import json
+
+import support_system as ss
+
+
+def test_export_summary_uses_recorded_tier(tmp_path):
+    export = tmp_path / "tickets_data_20260101_000000.json"
+    record = {"ticket_id": "TKT1", "customer_id": "CUST999", "customer_tier": "premium", "query": "Refund please",
+              "intent": "returns", "priority": "normal", "sentiment_score": 0.9, "escalated": False}
+    export.write_text(json.dumps([record]), encoding="utf-8")
+    document, parsed = ss.summarize_export(str(export))
+    assert parsed
+    assert document["tiers"] == {"premium": 1}
@@ -0,0 +1,29 @@
+"""SLA deadlines are checked when a ticket is answered, not when it leaves the graph"""
+import support_system as ss
+
+
+def test_reviewed_tickets_complete_after_review():
+    now = [0.0]
+    scheduler = ss.SLAScheduler(clock=lambda: now[0], targets={"standard": 10.0}, priority_factors={})
+    late = []
+    scheduler.on_deadline_miss(lambda ticket, seconds: late.append((ticket.query_data["query"], seconds)))
+    records = [{"customer_id": "CUST999", "query": query, "timestamp": 0} for query in ("first", "second", "third")]
+
+    processed = [{"ticket_id": f"TKT-{index}", "query": record["query"], "escalated": record["query"] == "first"}
+                 for index, record in enumerate(scheduler.reorder(records))]
+
+    def review(results):
+        # Auto-approved tickets go out at once; the escalated one 30 seconds later
+        held = []
+        for result in results:
+            if result["escalated"]:
+                held.append(result)
+            else:
+                yield result
+        now[0] += 30.0
+        yield from held
+
+    answered = [result["query"] for result in scheduler.track(review(scheduler.match(processed)))]
+    assert answered == ["second", "third", "first"]
+    assert (scheduler.answered, scheduler.missed) == (3, 1)
+    assert late == [("first", 20.0)]
@@ -0,0 +1,8 @@
+"""Importing the module and answering a first ticket must stay within STARTUP_BUDGET_MS"""
+import support_system as ss
+
+
+def test_startup_within_budget():
+    report, violations = ss.check_startup(runs=3)
+    assert violations == [], report
+    assert report["lazy_loaded"] == []